@@ -0,0 +1,69 @@
+class AnimationClip:
+    """
+    An animation shared by every tile of the same type. All of them show the same frame, so the frame index is
+    kept (and advanced) only once, here.
+    """
+    def __init__(self, frames, speed):
+        """
+        Args:
+            frames (List[pygame.Surface]): The frames of the animation.
+            speed (float): The frames shown per second.
+        """
+        self.frames = frames
+        self.speed = speed
+        self.frame_index = 0
+
+    @property
+    def frame(self):
+        """
+        int: The index of the current frame.
+        """
+        return int(self.frame_index) % len(self.frames)
+
+    @property
+    def image(self):
+        """
+        pygame.Surface: The current frame.
+        """
+        return self.frames[self.frame]
+
+    def update(self, dt):
+        """
+        Advance the animation.
+
+        Args:
+            dt (int): The time since the last frame.
+        """
+        self.frame_index += self.speed * dt
+
+class AnimationClock:
+    """
+    Advances all the animation clips of a scene once per frame.
+    """
+    def __init__(self):
+        self.clips = []
+
+    def clip(self, frames, speed):
+        """
+        Create a clip driven by this clock.
+
+        Args:
+            frames (List[pygame.Surface]): The frames of the animation.
+            speed (float): The frames shown per second.
+
+        Returns:
+            AnimationClip: The new clip.
+        """
+        clip = AnimationClip(frames, speed)
+        self.clips.append(clip)
+        return clip
+
+    def update(self, dt):
+        """
+        Advance every clip.
+
+        Args:
+            dt (int): The time since the last frame.
+        """
+        for clip in self.clips:
+            clip.update(dt)
@@ -1,212 +1,168 @@
-import os
 import pygame
 
 
-def import_assets_level(self):
-    tmx_data = load_pygame("data/tmx/map.tmx")
-    
-    # Cycle through all the visible layers, and add them to the sprite group
-    for layer in tmx_data.layers:
-        # Ground layers
-        if layer.name == "Ground":
-            for x, y, surf in layer.tiles():
-                Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["ground"])
-        
-        if layer.name == "Paths":
-            for x, y, surf in layer.tiles():
-                Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["ground_plants"])
-    
-        if layer.name == "Hills":
-            for x, y, surf in layer.tiles():
-                Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["ground_plants"])
-
-        # House layers
-        if layer.name == "House Floor":
-            for x, y, surf in layer.tiles():
-                Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["house_bottom"])
-        if layer.name == "House Furniture Bottom":
-            for x, y, surf in layer.tiles():
-                Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["house_bottom"])
-        if layer.name == "House Walls":
-            for x, y, surf in layer.tiles():
-                Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["main"])
-        if layer.name == "House Furniture Top":
-            for x, y, surf in layer.tiles():
-                Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["main"])
-                
-        # Fences
-        if layer.name == "Fences":
-            for x, y, surf in layer.tiles():
-                Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=[self.all_sprites, self.collision_sprites], z=LAYERS["main"])
-                
-        # Water
-        water_sprite = pygame.image.load("assets/Tilesets/Water.png").convert_alpha()
-        frame_width = water_sprite.get_width() // 4
-        frame_height = water_sprite.get_height() // 1
-        
-        water_frames = []
-        for col in range(4):
-            for row in range(1):
-                frame = water_sprite.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                water_frames.append(frame)
-        
-        if layer.name == "Water":
-            for x, y, surf in layer.tiles():
-                Water(pos=(x * TILE_SIZE, y * TILE_SIZE), frames=water_frames, groups=self.all_sprites) 
-        
-        # Small plants (object layer)
-        if layer.name == "Small Plants":
-            for obj in layer:
-                WildFlower(pos=(obj.x, obj.y), surf=obj.image, groups=[self.all_sprites, self.collision_sprites])
-        
-        if layer.name == "Hill Objects":
-            for obj in layer:
-                WildFlower(pos=(obj.x, obj.y), surf=obj.image, groups=[self.all_sprites, self.collision_sprites])
-                
-        # Trees (object layer)
-        if layer.name == "Trees":
-            for obj in layer:
-                Tree(pos=(obj.x, obj.y), surf=obj.image, groups=[self.all_sprites, self.collision_sprites, self.tree_sprites], name=obj.name, update_inventory=self.update_inventory)
-        
-        # Player
-        if layer.name == "Player":
-            for obj in layer:
-                if obj.name == "Spawn":
-                    self.player = Player((obj.x, obj.y), self.all_sprites, self.collision_sprites, self.tree_sprites, self.interaction_sprites)
-                if obj.name == "Bed":
-                    Interaction(pos=(obj.x, obj.y), size=(obj.width, obj.height), groups=self.interaction_sprites, name=obj.name)
-        
-        # Collision layer
-        if layer.name == "Collision Layer":
-            for x, y, surf in layer.tiles():
-                Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=pygame.Surface((TILE_SIZE, TILE_SIZE)), groups=self.collision_sprites, z=LAYERS["main"])
-                
-def import_assets_overlay(self):
-    basic_tools_materials = pygame.image.load('assets/Objects/Basic tools and meterials.png').convert_alpha()
-    frame_width = basic_tools_materials.get_width() // 3
-    frame_height = basic_tools_materials.get_height() // 2
-
-    for row in range(2):
-        for col in range(3):
-            # Get the frame from the spritesheet
-            frame = basic_tools_materials.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-            if row == 0:
-                if col == 0 and 'water' in self.player.tools:
-                    self.tools_surfaces['water'] = frame
-                if col == 1 and 'axe' in self.player.tools:
-                    self.tools_surfaces['axe'] = frame
-                if col == 2 and 'hoe' in self.player.tools:
-                    self.tools_surfaces['hoe'] = frame
-                
-    basic_plants = pygame.image.load('assets/Objects/Basic Plants.png').convert_alpha()
-    frame_width = basic_plants.get_width() // 6
-    frame_height = basic_plants.get_height() // 2
-    
-    for row in range(2):
-        for col in range(6):
-            # Get the frame from the spritesheet
-            frame = basic_plants.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-            if row == 0:
-                if col == 0 and 'corn' in self.player.seeds:
-                    self.seeds_surfaces['corn'] = frame
-            if row == 1:
-                if col == 0 and 'tomato' in self.player.seeds:
-                    self.seeds_surfaces['tomato'] = frame
-                
-    
-def import_assets_player(self):
-    self.animations = {'up': [], 'down': [], 'left': [], 'right': [],
-                        'up_idle': [], 'down_idle': [], 'left_idle': [], 'right_idle': [],
-                        'up_hoe': [], 'down_hoe': [], 'left_hoe': [], 'right_hoe': [],
-                        'up_axe': [], 'down_axe': [], 'left_axe': [], 'right_axe': [],
-                        'up_water': [], 'down_water': [], 'left_water': [], 'right_water': []}
-    
-    basic_sprite_sheet = pygame.image.load('assets/Characters/Basic Charakter Spritesheet.png').convert_alpha()
-    frame_width = basic_sprite_sheet.get_width() // 4
-    frame_height = basic_sprite_sheet.get_height() // 4
-    
-    # This variable is used to store the frame of the animation and properly order them
-    frame_1 = None
-    frame_idle = None
-    frame_2 = None
-    frame_3 = None
-    for row in range(4):
-        for col in range(4):
-            # Get the frame from the spritesheet
-            frame = basic_sprite_sheet.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-            if col == 0:
-                frame_1 = frame
-            elif col == 1:
-                frame_idle = frame
-            elif col == 2:
-                frame_2 = frame
-            elif col == 3:
-                frame_3 = frame
-        
-        # Setting the animation frame order        
-        if row == 0:
-            self.animations['down'] = [frame_1, frame_2, frame_1, frame_3]
-            self.animations['down_idle'] = [frame_idle, frame_1]
-        if row == 1:
-            self.animations['up'] = [frame_1, frame_2, frame_1, frame_3]
-            self.animations['up_idle'] = [frame_idle, frame_1]
-        if row == 2:
-            self.animations['left'] = [frame_1, frame_2, frame_1, frame_3]
-            self.animations['left_idle'] = [frame_idle, frame_1]
-        if row == 3:
-            self.animations['right'] = [frame_1, frame_2, frame_1, frame_3]
-            self.animations['right_idle'] = [frame_idle, frame_1]
-                
-    action_sprite_sheet = pygame.image.load('assets/Characters/Basic Charakter Actions.png').convert_alpha()
-    frame_width = action_sprite_sheet.get_width() // 2
-    frame_height = action_sprite_sheet.get_height() // 12
-    
-    for row in range(12):
-        for col in range(2):
-            # Get the frame from the spritesheet
-            frame = action_sprite_sheet.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-            if row == 0:
-                self.animations['down_hoe'].append(frame)
-            elif row == 1:
-                self.animations['up_hoe'].append(frame)
-            elif row == 2:
-                self.animations['left_hoe'].append(frame)
-            elif row == 3:
-                self.animations['right_hoe'].append(frame)
-            
-            if row == 4:
-                self.animations['down_axe'].append(frame)
-            elif row == 5:
-                self.animations['up_axe'].append(frame)
-            elif row == 6:
-                self.animations['left_axe'].append(frame)
-            elif row == 7:
-                self.animations['right_axe'].append(frame)
-                
-            if row == 8:
-                self.animations['down_water'].append(frame)
-            elif row == 9:
-                self.animations['up_water'].append(frame)
-            elif row == 10:
-                self.animations['left_water'].append(frame)
-            elif row == 11:
-                self.animations['right_water'].append(frame)
-                
-def import_assets_tree(self):
-    grass_biom_sprites = pygame.image.load("assets/Objects/Basic Grass Biom things 1.png").convert_alpha()
-    frame_width = grass_biom_sprites.get_width() // 9
-    frame_height = grass_biom_sprites.get_height() // 5
-    
-    for col in range(9):
-        for row in range(5):
-            frame = grass_biom_sprites.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-            if col == 0 and row == 2:
-                self.apple_surface = frame
-            
-            if self.name == "Tree":
-                if col == 3 and row == 2:
-                    self.stump_surface = frame
-            
-            if self.name == "Tree Large":
-                if col == 4 and row == 2:
-                    self.stump_surface = frame
\ No newline at end of file
+# Sprite sheets: name -> (path, columns, rows) ----------------------------------------------------------
+SHEETS = {
+    'character': ('assets/Characters/Basic Charakter Spritesheet.png', 4, 4),
+    'character_actions': ('assets/Characters/Basic Charakter Actions.png', 2, 12),
+    'grass_biom': ('assets/Objects/Basic Grass Biom things 1.png', 9, 5),
+    'plants': ('assets/Objects/Basic Plants.png', 6, 2),
+    'tilled_dirt': ('assets/Tilesets/Tilled Dirt.png', 8, 8),
+    'water': ('assets/Tilesets/Water.png', 4, 1),
+    'tools_ui': ('assets/Sprite sheets UI/Basic UI/Tools_ui.png', 3, 2),
+    'play_button': ('assets/Sprite sheets UI/Basic UI/UI Big Play Button.png', 2, 2),
+    'config_button': ('assets/Sprite sheets UI/Basic UI/Config_btn.png', 2, 1),
+    'info_button': ('assets/Sprite sheets UI/Basic UI/Info_btn.png', 2, 1),
+    'title': ('assets/Title_tr.png', 1, 1),
+    'rain1': ('assets/Rain/rain1.png', 1, 1),
+    'rain2': ('assets/Rain/rain2.png', 1, 1),
+    'rain3': ('assets/Rain/rain3.png', 1, 1),
+    'floor1': ('assets/Rain/floor1.png', 1, 1),
+    'floor2': ('assets/Rain/floor2.png', 1, 1),
+    'floor3': ('assets/Rain/floor3.png', 1, 1),
+}
+
+# Named frames: name -> (sheet, [(col, row), ...], scale) -----------------------------------------------
+# A sheet name that is not in this table can also be used as a frame (the whole image).
+FRAMES = {
+    # Player movement (the idle frame is the second column of the sheet)
+    'player_down': ('character', [(0, 0), (2, 0), (0, 0), (3, 0)], 1),
+    'player_down_idle': ('character', [(1, 0), (0, 0)], 1),
+    'player_up': ('character', [(0, 1), (2, 1), (0, 1), (3, 1)], 1),
+    'player_up_idle': ('character', [(1, 1), (0, 1)], 1),
+    'player_left': ('character', [(0, 2), (2, 2), (0, 2), (3, 2)], 1),
+    'player_left_idle': ('character', [(1, 2), (0, 2)], 1),
+    'player_right': ('character', [(0, 3), (2, 3), (0, 3), (3, 3)], 1),
+    'player_right_idle': ('character', [(1, 3), (0, 3)], 1),
+
+    # Player actions
+    'player_down_hoe': ('character_actions', [(0, 0), (1, 0)], 1),
+    'player_up_hoe': ('character_actions', [(0, 1), (1, 1)], 1),
+    'player_left_hoe': ('character_actions', [(0, 2), (1, 2)], 1),
+    'player_right_hoe': ('character_actions', [(0, 3), (1, 3)], 1),
+    'player_down_axe': ('character_actions', [(0, 4), (1, 4)], 1),
+    'player_up_axe': ('character_actions', [(0, 5), (1, 5)], 1),
+    'player_left_axe': ('character_actions', [(0, 6), (1, 6)], 1),
+    'player_right_axe': ('character_actions', [(0, 7), (1, 7)], 1),
+    'player_down_water': ('character_actions', [(0, 8), (1, 8)], 1),
+    'player_up_water': ('character_actions', [(0, 9), (1, 9)], 1),
+    'player_left_water': ('character_actions', [(0, 10), (1, 10)], 1),
+    'player_right_water': ('character_actions', [(0, 11), (1, 11)], 1),
+
+    # Trees
+    'apple': ('grass_biom', [(0, 2)], 1),
+    'tree_stump': ('grass_biom', [(3, 2)], 1),
+    'tree_large_stump': ('grass_biom', [(4, 2)], 1),
+
+    # Crops (growth stages) and seeds
+    'corn': ('plants', [(1, 0), (2, 0), (3, 0), (4, 0)], 1),
+    'tomato': ('plants', [(1, 1), (2, 1), (3, 1), (4, 1)], 1),
+    'corn_seed': ('plants', [(0, 0)], 1),
+    'tomato_seed': ('plants', [(0, 1)], 1),
+
+    # Soil
+    'soil': ('tilled_dirt', [(2, 4)], 1),
+    'soil_water': ('tilled_dirt', [(1, 0)], 1),
+
+    # Water animation
+    'water': ('water', [(0, 0), (1, 0), (2, 0), (3, 0)], 1),
+    'menu_water': ('water', [(0, 0), (1, 0), (2, 0), (3, 0)], 2),
+
+    # Overlay
+    'hoe_icon': ('tools_ui', [(1, 0)], 1),
+    'water_icon': ('tools_ui', [(2, 0)], 1),
+    'axe_icon': ('tools_ui', [(0, 1)], 1),
+
+    # Menu buttons (released and pressed)
+    'play_button': ('play_button', [(0, 1), (1, 1)], 3),
+    'config_button': ('config_button', [(0, 0), (1, 0)], 3),
+    'info_button': ('info_button', [(0, 0), (1, 0)], 3),
+}
+
+# Everything loaded so far, shared by the whole process
+loaded_sheets = {}
+loaded_frames = {}
+decoding_sheets = {}  # {name: Future}, sheets being decoded by a worker thread
+
+
+def preload(executor):
+    """
+    Start decoding all the sprite sheets on worker threads. The files are only read and decoded there: the
+    conversion to the display format is left to the main thread, the first time each sheet is requested.
+
+    Args:
+        executor (concurrent.futures.Executor): The worker threads.
+    """
+    for name, (path, columns, rows) in SHEETS.items():
+        if name not in loaded_sheets and name not in decoding_sheets:
+            decoding_sheets[name] = executor.submit(pygame.image.load, path)
+
+
+def sheet(name):
+    """
+    Get a sprite sheet. It is loaded and converted only the first time it is requested.
+
+    Args:
+        name (string): The name of the sheet in the SHEETS table.
+
+    Returns:
+        pygame.Surface: The whole sprite sheet.
+    """
+    if name not in loaded_sheets:
+        decoding = decoding_sheets.pop(name, None)
+        surface = decoding.result() if decoding is not None else pygame.image.load(SHEETS[name][0])
+        loaded_sheets[name] = surface.convert_alpha()
+    return loaded_sheets[name]
+
+
+def frames(name):
+    """
+    Get the frames of an animation (or a single image) from the FRAMES table. The surfaces are sliced only
+    once and the same list is returned to everyone, so it must not be modified.
+
+    Args:
+        name (string): The name of the frames in the FRAMES table (or the name of a sheet).
+
+    Returns:
+        List[pygame.Surface]: The frames, in order.
+    """
+    if name not in loaded_frames:
+        sheet_name, cells, scale = FRAMES.get(name, (name, [(0, 0)], 1))
+        sheet_surface = sheet(sheet_name)
+        columns, rows = SHEETS[sheet_name][1:]
+        frame_width = sheet_surface.get_width() // columns
+        frame_height = sheet_surface.get_height() // rows
+
+        surfaces = []
+        for col, row in cells:
+            frame = sheet_surface.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
+            if scale != 1:
+                frame = pygame.transform.scale(frame, (frame_width * scale, frame_height * scale))
+            surfaces.append(frame)
+        loaded_frames[name] = surfaces
+    return loaded_frames[name]
+
+
+def frame(name):
+    """
+    Get a single image from the FRAMES table (the first frame, if there is more than one).
+
+    Args:
+        name (string): The name of the frame in the FRAMES table (or the name of a sheet).
+
+    Returns:
+        pygame.Surface: The image.
+    """
+    return frames(name)[0]
+
+
+def release(*names):
+    """
+    Forget frames and sheets that are not needed anymore. They are loaded again if they are requested later.
+
+    Args:
+        *names (string): The names of the frames and sheets.
+    """
+    for name in names:
+        loaded_frames.pop(name, None)
+        loaded_sheets.pop(name, None)
@@ -0,0 +1,349 @@
+import pygame
+from settings import *
+from main import Game
+from level import Level
+from sprites import Tile
+from timer import game_clock
+from soil import FARMABLE
+import tilemap
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from array import array
+
+import numpy as np
+
+
+# Scales of each benchmark (full run and --quick run) ---------------------------------------------------
+SCALES = {
+    "sprites": ([1000, 10000, 100000], [1000, 10000]),
+    "obstacles": ([1000, 10000, 100000], [1000, 10000]),
+    "farm_tiles": ([100, 1000, None], [100, 1000]),  # None is the whole map
+    "map_repeat": ([1, 4, 8], [1, 4]),  # Copies of the map on each axis, for the streaming of regions
+    "rain_seconds": ([1, 5, 20], [1, 5]),
+    "frames": ([600], [120]),
+}
+
+
+def measure(function, repeat):
+    """
+    Call a function several times and measure how long each call takes.
+
+    Args:
+        function (Callable): The function to be measured (called without arguments).
+        repeat (int): The number of calls.
+
+    Returns:
+        dict: The mean, median, p95, min and max time of a call, in milliseconds.
+    """
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+
+    times.sort()
+    return {"repeat": repeat,
+            "mean_ms": statistics.fmean(times),
+            "median_ms": statistics.median(times),
+            "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+            "min_ms": times[0],
+            "max_ms": times[-1]}
+
+
+def scatter(level, count, surf, groups, z):
+    """
+    Create sprites at random positions of the map.
+
+    Args:
+        level (Level): The level with the map.
+        count (int): The number of sprites.
+        surf (pygame.Surface): The image of the sprites.
+        groups (List[pygame.sprite.Group]): The groups of the sprites.
+        z (int): The layer of the sprites.
+
+    Returns:
+        List[Tile]: The sprites created.
+    """
+    width, height = level.tile_map.width * TILE_SIZE, level.tile_map.height * TILE_SIZE
+    return [Tile(pos=(random.randrange(width), random.randrange(height)), surf=surf, groups=groups, z=z) for i in range(count)]
+
+
+
+def reload_soil(soil):
+    """
+    Make again the farm layers and crops of the loaded regions, after the soil grid was changed by hand.
+
+    Args:
+        soil (Soil): The soil.
+    """
+    for region in list(soil.regions):
+        soil.unload_region(region)
+        soil.load_region(region)
+
+
+def repeated_map(path, repeat):
+    """
+    Make a bigger map out of copies of a map, side by side. It is kept with the loaded maps, so a level can
+    be made from it.
+
+    Args:
+        path (string): The path of the tmx file.
+        repeat (int): The copies of the map on each axis.
+
+    Returns:
+        string: The path the bigger map was kept under.
+    """
+    source = tilemap.load_map(path)
+    width, height = source.width, source.height
+    layers = []
+    for layer in source.layers:
+        if isinstance(layer, tilemap.TileLayer):
+            gids = np.tile(np.frombuffer(layer.gids, dtype=np.uint16).reshape(height, width), (repeat, repeat))
+            layers.append(tilemap.TileLayer(layer.name, layer.visible, width * repeat, height * repeat,
+                                            array("H", gids.tobytes()), layer.images))
+        elif layer.name == "Player":  # Only one player and one bed
+            layers.append(layer)
+        else:
+            objects = [tilemap.MapObject(obj.x + column * width * TILE_SIZE, obj.y + row * height * TILE_SIZE,
+                                         obj.width, obj.height, obj.name, obj.type, obj.image)
+                       for row in range(repeat) for column in range(repeat) for obj in layer]
+            layers.append(tilemap.ObjectLayer(layer.name, layer.visible, objects))
+
+    repeated_path = f"{path}#{repeat}x{repeat}"
+    tilemap.loaded_maps[repeated_path] = tilemap.TileMap(width * repeat, height * repeat, source.tilewidth,
+                                                         source.tileheight, layers, source.tilesets)
+    return repeated_path
+
+# Benchmarks --------------------------------------------------------------------------------------------
+def bench_draw(level, count, repeat):
+    """
+    CameraGroup.custom_draw with extra sprites spread over the map.
+    """
+    surf = pygame.Surface((TILE_SIZE, TILE_SIZE)).convert()
+    sprites = scatter(level, count, surf, [level.all_sprites], LAYERS["main"])
+    level.all_sprites.custom_draw(level.player)  # The new sprites are indexed on the first draw
+
+    result = measure(lambda: level.all_sprites.custom_draw(level.player), repeat)
+    for sprite in sprites:
+        sprite.kill()
+    return result
+
+
+def bench_collision(level, count, repeat):
+    """
+    Player.move (and its collisions) with extra obstacles spread over the map.
+    """
+    surf = pygame.Surface((TILE_SIZE, TILE_SIZE)).convert()
+    sprites = scatter(level, count, surf, [level.collision_sprites], LAYERS["main"])
+    player = level.player
+    start = pygame.math.Vector2(player.pos)
+
+    def move():
+        player.pos.update(start)
+        player.direction.update(1, 1)
+        player.move(1 / 60)
+
+    move()  # The new obstacles are indexed on the first query
+    result = measure(move, repeat)
+    player.pos.update(start)
+    for sprite in sprites:
+        sprite.kill()
+    return result
+
+
+def bench_soil(level, count, repeat):
+    """
+    Soil.hit over every tile of a farm, and Soil.water_all (with the farm redraw) on the whole farm.
+    """
+    soil = level.soil_layer
+    farmable = soil.grid & FARMABLE
+    raining = soil.raining
+    soil.raining = False
+
+    # The farm is made of the first tiles of the map, in rows (the farm layers of the regions are made again)
+    soil.grid[:] = 0
+    soil.grid.reshape(-1)[:count] = FARMABLE
+    reload_soil(soil)
+    points = [((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE) for y, x in np.argwhere(soil.grid & FARMABLE).tolist()]
+
+    def hit():
+        for point in points:
+            soil.hit(point)
+
+    def water_all():
+        soil.remove_water()
+        soil.water_all()
+        for farm_layer in soil.farm_layers.values():
+            farm_layer.update(1 / 60)
+
+    results = {"hit_all": measure(hit, max(1, repeat // 20)),
+               "water_all": measure(water_all, repeat)}
+    results["hit_all"]["per_hit_ms"] = results["hit_all"]["mean_ms"] / max(1, len(points))
+
+    # Leave the soil the way it was
+    soil.grid[:] = farmable
+    reload_soil(soil)
+    soil.raining = raining
+    return results
+
+
+def bench_rain(level, seconds, dt):
+    """
+    Rain.update and the drawing of the rain (on its own surface, without the world) while it rains for some
+    (simulated) seconds.
+    """
+    frames = int(seconds / dt)
+    level.all_sprites.custom_draw(level.player)  # Places the camera, the rain spawns inside its view
+    surface = pygame.Surface(level.all_sprites.view_rect().size).convert()
+    offset = level.all_sprites.offset
+
+    def frame():
+        level.rain.update(dt)
+        level.rain.draw_puddles(surface, offset)
+        level.rain.draw_drops(surface, offset)
+        game_clock.advance(dt * 1000)
+
+    result = measure(frame, frames)
+    result["particles"] = int((level.rain.lifetime > 0).sum())
+    return result
+
+
+def bench_loading(repeat):
+    """
+    Level creation (Level.import_assets included), loading the map from its compiled copy and compiling it.
+    """
+    path = "data/tmx/map.tmx"
+
+    def load_cached():
+        tilemap.loaded_maps.clear()
+        tilemap.load_map(path)
+
+    with tempfile.TemporaryDirectory() as folder:
+        compiled_path = os.path.join(folder, "map.cache")
+        results = {"level": measure(Level, repeat),
+                   "map_cached": measure(load_cached, repeat),
+                   "map_compile": measure(lambda: tilemap.compile_map(path, compiled_path), max(1, repeat // 5))}
+    return results
+
+
+def bench_streaming(controls, repeat, dt):
+    """
+    Level creation on a map made of copies of the map, and the streaming of regions (RegionStreamer.update)
+    while the player walks across it.
+    """
+    path = repeated_map("data/tmx/map.tmx", repeat)
+    start = time.perf_counter()
+    level = Level(controls, map_path=path)
+    result = {"build_ms": (time.perf_counter() - start) * 1000,
+              "map_tiles": level.tile_map.width * level.tile_map.height}
+
+    # The player walks to the right, as far as the map goes
+    player = level.player
+    speed = player.speed * dt
+    steps = int((level.tile_map.width * TILE_SIZE - player.pos.x) / speed)
+    sprites, regions = [], []
+
+    def step():
+        player.pos.x += speed
+        level.streamer.update(player.pos)
+        sprites.append(len(level.all_sprites))
+        regions.append(len(level.streamer.loaded))
+
+    result.update(measure(step, max(1, steps)))
+    result["max_sprites"] = max(sprites)
+    result["max_regions"] = max(regions)
+
+    level.unload()
+    del tilemap.loaded_maps[path]
+    return result
+
+
+def bench_scenes(seed):
+    """
+    Switching from the level to the menu and back: each scene is built again and the other one is released.
+    """
+    game = Game(headless=True, seed=seed)
+    for name in ["menu", "level"]:
+        game.scenes.switch(name)
+        game.scenes.step(None)
+    return game.scenes.report()
+
+
+def bench_frames(game, frames, dt):
+    """
+    End to end: N frames of Level.run.
+    """
+    start = time.perf_counter()
+    result = measure(lambda: game.simulate(1, dt), frames)
+    result["fps"] = frames / (time.perf_counter() - start)
+    return result
+
+
+def run(quick=False, seed=0, repeat=60, dt=SIMULATION_STEP):
+    """
+    Run every benchmark.
+
+    Args:
+        quick (bool): Use only the smaller scales.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of measured calls of each benchmark.
+        dt (float): The simulated time of each frame in seconds.
+
+    Returns:
+        dict: The results, by benchmark and scale.
+    """
+    scale = 1 if quick else 0
+    game = Game(headless=True, seed=seed)
+    level = game.level
+    level.raining = False
+
+    results = {"draw": {}, "collision": {}, "soil": {}, "rain": {}}
+    for count in SCALES["sprites"][scale]:
+        results["draw"][count] = bench_draw(level, count, repeat)
+    for count in SCALES["obstacles"][scale]:
+        results["collision"][count] = bench_collision(level, count, repeat * 10)
+    for count in SCALES["farm_tiles"][scale]:
+        count = count or level.soil_layer.grid.size
+        results["soil"][count] = bench_soil(level, count, repeat)
+    for seconds in SCALES["rain_seconds"][scale]:
+        results["rain"][seconds] = bench_rain(Level(game.controls), seconds, dt)
+    results["loading"] = bench_loading(max(1, repeat // 10))
+    results["streaming"] = {copies: bench_streaming(game.controls, copies, dt) for copies in SCALES["map_repeat"][scale]}
+    results["scenes"] = bench_scenes(seed)
+
+    results["frames"] = {}
+    for frames in SCALES["frames"][scale]:
+        game = Game(headless=True, seed=seed)
+        results["frames"][frames] = bench_frames(game, frames, dt)
+
+    return {"python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "seed": seed,
+            "quick": quick,
+            "results": results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sprout Lands benchmarks (headless)")
+    parser.add_argument("--quick", action="store_true", help="run only the smaller scales")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random number generator")
+    parser.add_argument("--repeat", type=int, default=60, help="measured calls of each benchmark")
+    parser.add_argument("--output", default=None, help="json file for the results (printed if not given)")
+    args = parser.parse_args()
+
+    report = run(args.quick, args.seed, args.repeat)
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
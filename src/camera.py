@@ -0,0 +1,385 @@
+import pygame
+from settings import *
+from spatial import SpatialHash
+
+
+class ChunkCache:
+    """
+    Cache of static tile layers baked into fixed-size chunk surfaces. Tiles that never change are blitted
+    once at load time, so the camera only has to draw the few chunks that overlap the viewport. Animated tiles
+    that share a clip are baked once per frame of the clip, and the chunks of the current frame are drawn.
+    """
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_pixels = chunk_size * TILE_SIZE
+        self.chunks = {}  # {z: {(chunk_x, chunk_y): Surface}}
+        self.animated = {}  # {z: {clip: [{(chunk_x, chunk_y): Surface} for each frame of the clip]}}
+
+    def bake(self, layer, pos, surf):
+        """
+        Blit a tile into the chunk of a layer that contains it, creating the chunk if needed.
+
+        Args:
+            layer (Dict[Tuple[int, int], pygame.Surface]): The chunks of the layer.
+            pos (Tuple[int, int]): The top left position of the tile in the world.
+            surf (pygame.Surface): The image of the tile.
+        """
+        key = (int(pos[0]) // self.chunk_pixels, int(pos[1]) // self.chunk_pixels)
+        if key not in layer:
+            layer[key] = pygame.Surface((self.chunk_pixels, self.chunk_pixels), pygame.SRCALPHA).convert_alpha()
+
+        local_pos = (pos[0] - key[0] * self.chunk_pixels, pos[1] - key[1] * self.chunk_pixels)
+        layer[key].blit(surf, local_pos)
+
+    def add(self, pos, surf, z):
+        """
+        Bake a tile into the chunk that contains it.
+
+        Args:
+            pos (Tuple[int, int]): The top left position of the tile in the world.
+            surf (pygame.Surface): The image of the tile.
+            z (int): The layer of the tile.
+        """
+        self.bake(self.chunks.setdefault(z, {}), pos, surf)
+
+    def add_animated(self, pos, clip, z):
+        """
+        Bake an animated tile into the chunks of every frame of its clip.
+
+        Args:
+            pos (Tuple[int, int]): The top left position of the tile in the world.
+            clip (AnimationClip): The animation shared by the tiles of this type.
+            z (int): The layer of the tile.
+        """
+        frames = self.animated.setdefault(z, {}).setdefault(clip, [{} for frame in clip.frames])
+        for layer, surf in zip(frames, clip.frames):
+            self.bake(layer, pos, surf)
+
+    def remove(self, key):
+        """
+        Drop a chunk from every layer (static and animated).
+
+        Args:
+            key (Tuple[int, int]): The x and y of the chunk.
+        """
+        for layer in self.chunks.values():
+            layer.pop(key, None)
+        for clips in self.animated.values():
+            for frames in clips.values():
+                for layer in frames:
+                    layer.pop(key, None)
+
+    def clear(self):
+        """
+        Drop all the chunks.
+        """
+        self.chunks.clear()
+        self.animated.clear()
+
+    def draw(self, surface, z, offset):
+        """
+        Draw the chunks of a layer (animated ones first, in their current frame) that overlap the given surface.
+
+        Args:
+            surface (pygame.Surface): The surface where the chunks will be drawn.
+            z (int): The layer to be drawn.
+            offset (pygame.math.Vector2): The camera offset (top left corner of the view in the world).
+        """
+        for clip, frames in self.animated.get(z, {}).items():
+            self.draw_chunks(surface, frames[clip.frame], offset)
+
+        layer = self.chunks.get(z)
+        if layer:
+            self.draw_chunks(surface, layer, offset)
+
+    def draw_chunks(self, surface, layer, offset):
+        """
+        Draw the chunks that overlap the given surface.
+
+        Args:
+            surface (pygame.Surface): The surface where the chunks will be drawn.
+            layer (Dict[Tuple[int, int], pygame.Surface]): The chunks to be drawn.
+            offset (pygame.math.Vector2): The camera offset (top left corner of the view in the world).
+        """
+        left = int(offset.x) // self.chunk_pixels
+        top = int(offset.y) // self.chunk_pixels
+        right = int(offset.x + surface.get_width()) // self.chunk_pixels
+        bottom = int(offset.y + surface.get_height()) // self.chunk_pixels
+
+        for chunk_y in range(top, bottom + 1):
+            for chunk_x in range(left, right + 1):
+                chunk = layer.get((chunk_x, chunk_y))
+                if chunk is not None:
+                    pos = (chunk_x * self.chunk_pixels - int(offset.x), chunk_y * self.chunk_pixels - int(offset.y))
+                    surface.blit(chunk, pos)
+
+class RenderList:
+    """
+    Persistent draw order of the camera. Visible sprites are bucketed by z layer and each bucket is kept sorted
+    by rect.centery, so a frame only has to fix the few sprites that moved or entered the view instead of
+    sorting everything again. Sprites with the same centery are drawn in the order they were added to the group.
+    """
+    def __init__(self, order):
+        """
+        Args:
+            order (Dict[pygame.sprite.Sprite, int]): The insertion order of the sprites of the group.
+        """
+        self.buckets = {layer: [] for layer in LAYERS.values()}
+        self.placed = {}  # {sprite: z of the bucket where it is}
+        self.sort_key = lambda sprite: (sprite.rect.centery, order[sprite])
+
+    def sort(self, visible):
+        """
+        Bring every bucket up to date with the visible sprites: drop the ones that left the view (or were
+        removed), move sprites whose z changed to their new bucket and restore the y order. The buckets are
+        nearly sorted from the previous frame, and the sort used (timsort) only does a linear pass over runs
+        that are already in order.
+
+        Args:
+            visible (Set[pygame.sprite.Sprite]): The sprites that have to be drawn this frame.
+        """
+        moved = []
+        for layer, bucket in self.buckets.items():
+            kept = [sprite for sprite in bucket if sprite.z == layer and sprite in visible]
+            if len(kept) != len(bucket):
+                for sprite in bucket:
+                    if sprite.z != layer or sprite not in visible:
+                        del self.placed[sprite]
+                        moved.append(sprite)
+                bucket[:] = kept
+
+        moved.extend(visible - self.placed.keys())
+        for sprite in moved:
+            if sprite in visible and sprite not in self.placed:
+                self.placed[sprite] = sprite.z
+                self.buckets.setdefault(sprite.z, []).append(sprite)
+
+        for bucket in self.buckets.values():
+            bucket.sort(key=self.sort_key)
+
+class CameraGroup(pygame.sprite.Group):
+    """
+    A custom sprite group that handles drawing sprites with a camera offset and zoom applied.
+    """
+    def __init__(self):
+        super().__init__()
+        self.display_surface = pygame.display.get_surface()
+        self.offset = pygame.math.Vector2(0, 0)
+        self.zoom = 3.0  # Default zoom level
+
+        # Surface where the world is drawn before being zoomed (created again when the zoom changes)
+        self.render_surface = None
+        self.render_zoom = None
+
+        # Static and animated layers baked at load time (they are not sprites of the group)
+        self.chunk_cache = ChunkCache()
+
+        # Viewport culling ------------------------------------------------------------------------------
+        self.spatial_hash = SpatialHash()
+        self.pending = set()  # Sprites added since the last draw (their rect might not be set yet)
+        self.dynamic_sprites = set()  # Sprites that can move, their cells are checked before each draw
+
+        # Draw order of the visible sprites
+        self.order = {}  # Insertion order, so sprites at the same height are always drawn in the same order
+        self.count = 0
+        self.render_list = RenderList(self.order)
+
+        # Systems that draw their own batch of images on a layer, after its sprites (like the rain)
+        self.layer_hooks = {}  # {z: [functions]}
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.pending.add(sprite)
+        self.order[sprite] = self.count
+        self.count += 1
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.pending.discard(sprite)
+        self.order.pop(sprite, None)
+        self.dynamic_sprites.discard(sprite)
+        self.spatial_hash.remove(sprite)
+
+    def remove_chunk(self, key):
+        """
+        Drop the baked chunk of every layer at a position (when its region of the map is evicted).
+
+        Args:
+            key (Tuple[int, int]): The x and y of the chunk.
+        """
+        self.chunk_cache.remove(key)
+
+    def release(self):
+        """
+        Remove every sprite and drop the baked chunks and the render surface.
+        """
+        self.empty()
+        self.chunk_cache.clear()
+        self.layer_hooks.clear()
+        self.render_surface = None
+        self.render_zoom = None
+
+    def refresh(self, sprite):
+        """
+        Update the cells of a sprite that is not dynamic after its rect changed (like a tree that became a stump).
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite whose rect changed.
+        """
+        if sprite not in self.pending:
+            self.spatial_hash.move(sprite)
+
+    def visible_sprites(self, view_rect):
+        """
+        Get the sprites that intersect the camera view. New sprites are indexed and the ones that can move
+        are updated in the spatial hash first.
+
+        Args:
+            view_rect (pygame.Rect): The area of the world seen by the camera.
+
+        Returns:
+            Set[pygame.sprite.Sprite]: The sprites to be drawn.
+        """
+        for sprite in self.pending:
+            self.spatial_hash.insert(sprite)
+            if getattr(sprite, "dynamic", False):
+                self.dynamic_sprites.add(sprite)
+        self.pending.clear()
+
+        for sprite in self.dynamic_sprites:
+            self.spatial_hash.move(sprite)
+
+        return self.spatial_hash.query(view_rect)
+
+    def add_static(self, pos, surf, z):
+        """
+        Add a tile that never changes to the static chunk cache instead of creating a sprite for it.
+
+        Args:
+            pos (Tuple[int, int]): The top left position of the tile in the world.
+            surf (pygame.Surface): The image of the tile.
+            z (int): The layer of the tile.
+        """
+        self.chunk_cache.add(pos, surf, z)
+
+    def add_animated(self, pos, clip, z):
+        """
+        Add an animated tile to the chunk cache. Its frames come from a clip shared by all the tiles of its type.
+
+        Args:
+            pos (Tuple[int, int]): The top left position of the tile in the world.
+            clip (AnimationClip): The animation of the tile.
+            z (int): The layer of the tile.
+        """
+        self.chunk_cache.add_animated(pos, clip, z)
+
+    def add_layer_hook(self, z, function):
+        """
+        Add a function that draws on a layer, right after the sprites of that layer.
+
+        Args:
+            z (int): The layer where the function draws.
+            function (Callable): Called with the surface and the camera offset.
+        """
+        self.layer_hooks.setdefault(z, []).append(function)
+
+    def view_rect(self):
+        """
+        Get the area of the world seen by the camera in the last draw.
+
+        Returns:
+            pygame.Rect: The area in world coordinates.
+        """
+        size = self.render_surface.get_size() if self.render_surface is not None else (SCREEN_WIDTH, SCREEN_HEIGHT)
+        return pygame.Rect((int(self.offset.x), int(self.offset.y)), size)
+
+    def get_render_surface(self):
+        """
+        Get the surface where the world is drawn before being zoomed. It is only created again when the zoom
+        changes, so a steady zoom does not allocate any surface per frame.
+
+        Returns:
+            pygame.Surface: The render surface for the current zoom.
+        """
+        if self.render_zoom != self.zoom:
+            self.render_zoom = self.zoom
+            size = (int(SCREEN_WIDTH // self.zoom), int(SCREEN_HEIGHT // self.zoom))
+            self.render_surface = pygame.Surface(size).convert()
+        return self.render_surface
+
+    def draw_layers(self, surface):
+        """
+        Draw the static chunks and the visible sprites of every layer on a surface, using the current offset.
+
+        Args:
+            surface (pygame.Surface): The surface where the world is drawn.
+        """
+        # Sort the sprites on screen by y value, so they are drawn in the correct order relative to the player
+        view_rect = pygame.Rect(self.offset, surface.get_size())
+        self.render_list.sort(self.visible_sprites(view_rect))
+
+        offset_x = int(self.offset.x)
+        offset_y = int(self.offset.y)
+        for layer, sprites in self.render_list.buckets.items():  # Cycle through all the layers
+            # Static tiles of the layer are drawn first, all at once
+            self.chunk_cache.draw(surface, layer, self.offset)
+
+            if sprites:
+                surface.blits([(sprite.image, (sprite.rect.x - offset_x, sprite.rect.y - offset_y)) for sprite in sprites], False)
+
+            for hook in self.layer_hooks.get(layer, ()):
+                hook(surface, self.offset)
+
+    def interpolate(self, alpha):
+        """
+        Move the sprites that keep their previous position (previous_pos) to where they are between their last
+        two simulation steps. The rects have to be restored after drawing.
+
+        Args:
+            alpha (float): How far the render time is between the last two simulation steps (0 to 1).
+
+        Returns:
+            List[Tuple[pygame.sprite.Sprite, Tuple[int, int]]]: The moved sprites and their simulated rect center.
+        """
+        moved = []
+        if alpha >= 1:
+            return moved
+
+        for sprite in self.dynamic_sprites:
+            previous_pos = getattr(sprite, "previous_pos", None)
+            if previous_pos is not None and previous_pos != sprite.pos:
+                moved.append((sprite, sprite.rect.center))
+                pos = previous_pos.lerp(sprite.pos, alpha)
+                sprite.rect.center = (round(pos.x), round(pos.y))
+        return moved
+
+    def custom_draw(self, player, alpha=1.0):
+        """
+        Draw the sprites in the group with the camera offset and zoom applied.
+
+        Args:
+            player (Player): The player object (the reference point for the camera)
+            alpha (float): How far the render time is between the last two simulation steps (0 to 1).
+        """
+        moved = self.interpolate(alpha)
+
+        render_surface = self.get_render_surface()
+        scaled_width, scaled_height = render_surface.get_size()
+
+        self.offset.x = player.rect.centerx - scaled_width // 2
+        self.offset.y = player.rect.centery - scaled_height // 2
+
+        render_surface.fill((0, 0, 0))
+        self.draw_layers(render_surface)
+
+        # Scale the render surface straight into the display surface
+        pygame.transform.scale(render_surface, (SCREEN_WIDTH, SCREEN_HEIGHT), self.display_surface)
+
+        for sprite, center in moved:
+            sprite.rect.center = center
+
+    def custom_draw_no_zoom(self, player):
+        # Player always stays in the center of the screen
+        self.offset.x = player.rect.centerx - SCREEN_WIDTH // 2
+        self.offset.y = player.rect.centery - SCREEN_HEIGHT // 2
+
+        self.draw_layers(self.display_surface)
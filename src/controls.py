@@ -0,0 +1,86 @@
+import pygame
+
+import json
+
+
+class KeyboardInput:
+    """
+    Input source that reads the real keyboard.
+    """
+    def get_pressed(self):
+        """
+        Get the state of the keys.
+
+        Returns:
+            Sequence[bool]: The pressed state of every key, indexed by pygame key constants.
+        """
+        return pygame.key.get_pressed()
+    
+    def advance(self):
+        """
+        Move to the next frame (nothing to do for a real keyboard).
+        """
+        pass
+
+class PressedKeys:
+    """
+    The state of the keys in a frame of a script, indexed like pygame.key.get_pressed().
+    """
+    def __init__(self, keys):
+        self.keys = keys
+        
+    def __getitem__(self, key):
+        return key in self.keys
+
+class ScriptedInput:
+    """
+    Input source that replays a script of pressed keys, one step per frame. It replaces the keyboard in
+    headless runs, so they always get the same input.
+    """
+    def __init__(self, script):
+        """
+        Args:
+            script (List[Tuple[int, List[string]]]): Steps of the script. Each step is a number of frames and the
+                names of the keys held during them (pygame key names, like "w", "space" or "return").
+        """
+        self.script = script
+        self.frames = None  # The key names are only converted to key codes once pygame is initialized
+        self.frame_index = 0
+        self.no_keys = PressedKeys(frozenset())
+        
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load a script from a json file, like [[60, ["w"]], [10, ["space"]]].
+
+        Args:
+            path (string): The path of the json file.
+
+        Returns:
+            ScriptedInput: The input source.
+        """
+        with open(path, encoding="utf-8") as file:
+            return cls(json.load(file))
+        
+    def get_pressed(self):
+        """
+        Get the state of the keys in the current frame. Nothing is pressed after the script ends.
+
+        Returns:
+            PressedKeys: The pressed state of every key.
+        """
+        if self.frames is None:
+            self.frames = []
+            for frames, key_names in self.script:
+                keys = PressedKeys(frozenset(pygame.key.key_code(name) for name in key_names))
+                self.frames.extend([keys] * frames)
+
+        if self.frame_index < len(self.frames):
+            return self.frames[self.frame_index]
+        return self.no_keys
+    
+    def advance(self):
+        """
+        Move to the next frame of the script.
+        """
+        self.frame_index += 1
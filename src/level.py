@@ -2,25 +2,34 @@ import pygame
 from settings import *
 from player import Player
 from overlay import Overlay
-from sprites import Tile, Water, WildFlower, Tree, Interaction, Particle
+from sprites import Tile, WildFlower, Tree, Interaction, Particle
 from soil import Soil
 from weather import Rain, Day
+from tint import ScreenTint
+from camera import CameraGroup
+from animation import AnimationClock
+from controls import KeyboardInput
+from timer import scheduler, game_clock
+import assets
+from spatial import CollisionGroup
+from streaming import RegionStreamer
+from profiler import FrameProfiler
+from save import Snapshot, SaveWriter, load_snapshot
 
-from pytmx.util_pygame import load_pygame
+from tilemap import load_map
 from random import randint
+import sys
 
 
 class Transition:
     """
-    Class for the transition between days inside the level
+    Class for the transition between days inside the level. It only keeps the fade, the screen is tinted by the level.
     """
     def __init__(self, reset, player):
         self.reset = reset
         self.player = player
-        self.display_surface = pygame.display.get_surface()
         
         # Transition variables --------------------------------------------------------------------------
-        self.image = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         self.color = 255
         self.speed = -2
 
@@ -37,28 +46,50 @@ class Transition:
             self.color = 255
             self.player.asleep = False
             self.speed = -2
-            
-        self.image.fill((self.color, self.color, self.color))
-        self.display_surface.blit(self.image, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
 
 class Level:
     """
     Class for the level screen. This is where the player will play the game.
     """
-    def __init__(self):
+    def __init__(self, controls=None, save_path=None, build=True, map_path="data/tmx/map.tmx"):
+        """
+        Args:
+            controls (KeyboardInput | ScriptedInput | None): Where the player input comes from (the keyboard by default).
+            save_path (string | None): The save file, loaded now and written every time the player sleeps.
+            build (bool): Build the level right away. Otherwise build() must be run to the end before using it.
+            map_path (string): The tmx file of the map.
+        """
         self.display_surface = pygame.display.get_surface()  # Get the surface of the display (same as screen on main.py)
+        self.controls = controls if controls is not None else KeyboardInput()  # Where the player input comes from
         
         # Sprite groups ---------------------------------------------------------------------------------
         self.all_sprites = CameraGroup()  # All sprites (everything)
-        self.collision_sprites = pygame.sprite.Group()  # Only sprites that the player can collide with
-        self.tree_sprites = pygame.sprite.Group()  # Only tree sprites
+        self.collision_sprites = CollisionGroup()  # Only sprites that the player can collide with (indexed in a grid)
+        self.tree_sprites = CollisionGroup(TILE_SIZE, rect_attr="rect")  # Only tree sprites (indexed by tile, for the axe)
         self.interaction_sprites = pygame.sprite.Group()  # Only sprites that the player can interact with
+        self.update_sprites = pygame.sprite.Group()  # Only sprites that have to be updated (they join and leave it)
+        self.animation_clock = AnimationClock()  # Animations shared by all the tiles of a type (like water)
         
+        self.save_path = save_path
+        self.map_path = map_path
+        if build:
+            for progress in self.build():
+                pass
+        
+    def build(self):
+        """
+        Create the sprites of the level and set up everything else. It pauses often, so the level can be built
+        a slice at a time while the game keeps drawing frames.
+
+        Yields:
+            float: The fraction of the level built so far.
+        """
         # Set up the player and its activities ----------------------------------------------------------
+        self.tile_map = load_map(self.map_path)  # Parsed only once, shared with the menu
         self.player = None
-        self.soil_layer = Soil(self.all_sprites)
+        self.soil_layer = Soil(self.all_sprites, self.update_sprites, self.tile_map)
         
-        self.import_assets()  # Import all the assets from the tmx file
+        yield from self.import_assets()  # Import all the assets from the tmx file
         
         # Set up the overlay and transition -------------------------------------------------------------
         self.overlay = Overlay(self.player)
@@ -69,121 +100,251 @@ class Level:
         self.raining = (randint(0, 100) < 30)
         self.soil_layer.raining = self.raining
         self.day = Day()
+        self.tint = ScreenTint()  # Day/night color and sleep fade, in one pass
+        
+        # Frame profiler (off until F3 is pressed) ------------------------------------------------------
+        self.profiler = FrameProfiler(stages=["update", "crops", "day", "rain", "transition", "draw", "overlay", "tint"],
+                                      counters={"all_sprites": lambda: len(self.all_sprites),
+                                                "collision_sprites": lambda: len(self.collision_sprites),
+                                                "farm_tiles": self.soil_layer.farm_tile_count,
+                                                "plant_sprites": lambda: len(self.soil_layer.plant_sprites)})
+        
+        # Save file -------------------------------------------------------------------------------------
+        self.saver = None
+        if self.save_path is not None:
+            snapshot = load_snapshot(self.save_path)
+            if snapshot is not None and snapshot.fits(self):
+                snapshot.restore(self)
+                self.streamer.update(self.player.pos, limit=None)  # The player may wake up somewhere else
+            self.saver = SaveWriter(self.save_path)  # Autosaves are written on a background thread
+        yield 1.0
         
     def import_assets(self):
         """
-        Import all map ans scenario related assets from a tmx file.
+        Import the map of the level. Only the player and the bed are created here: the rest of the map is split
+        in regions (squares of CHUNK_SIZE tiles), which are loaded when they come near the player and evicted
+        when they are left behind. The regions around the player are loaded one at a time, so the caller can
+        spread the work over several frames.
+
+        Yields:
+            float: The fraction of the regions around the player loaded so far.
         """
-        tmx_data = load_pygame("data/tmx/map.tmx")
+        self.water_clip = self.animation_clock.clip(assets.frames("water"), speed=2)  # Shared by all the water tiles
+        self.collision_surface = pygame.Surface((TILE_SIZE, TILE_SIZE))  # Invisible obstacles share one image
+        
+        # Regions of the map ----------------------------------------------------------------------------
+        self.streamer = RegionStreamer(columns=-(-self.tile_map.width // CHUNK_SIZE),
+                                       rows=-(-self.tile_map.height // CHUNK_SIZE),
+                                       load=self.load_region,
+                                       unload=self.unload_region)
+        self.region_sprites = {}  # {(region_x, region_y): sprites of the region}
+        self.region_objects = {}  # {(region_x, region_y): [(layer name, object id, object)]}
+        self.region_trees = {}  # {(region_x, region_y): ids of the trees of the region}
+        self.trees = {}  # {tree id: Tree}, the trees of the loaded regions
+        self.stored_trees = {}  # {tree id: (health, alive, apple slots)}, the trees of the regions evicted
+        self.tree_count = 0
+        
+        for layer in self.tile_map.layers:
+            if layer.name in ["Small Plants", "Hill Objects", "Ground Objects", "Trees"]:
+                for object_id, obj in enumerate(layer):
+                    region = self.streamer.region((obj.x, obj.y))
+                    self.region_objects.setdefault(region, []).append((layer.name, object_id, obj))
+                if layer.name == "Trees":
+                    self.tree_count = len(layer.objects)
+            
+            # Player ------------------------------------------------------------------------------------
+            if layer.name == "Player":
+                for obj in layer:
+                    if obj.name == "Spawn":
+                        self.player = Player((obj.x, obj.y), 
+                                             group=[self.all_sprites, self.update_sprites], 
+                                             collision_sprites=self.collision_sprites, 
+                                             trees_sprites=self.tree_sprites, 
+                                             interaction_sprites=self.interaction_sprites,
+                                             soil_layer=self.soil_layer,
+                                             controls=self.controls)
+                    if obj.name == "Bed":
+                        Interaction(pos=(obj.x, obj.y), size=(obj.width, obj.height), groups=self.interaction_sprites, name=obj.name)
+                        
+                    if obj.name == "Trade Boat":
+                        pass
         
-        # Cycle through all the visible layers, and add them to the sprite group
-        for layer in tmx_data.layers:
+        # The regions around the player are loaded before the first frame
+        self.streamer.update(self.player.pos, limit=0)
+        total = len(self.streamer.queue)
+        while self.streamer.queue:
+            yield 1 - len(self.streamer.queue) / total
+            self.streamer.update(self.player.pos, limit=1)
+            
+    def load_region(self, region):
+        """
+        Create the sprites of a region of the map and bake its static tiles into the camera chunks.
+
+        Args:
+            region (Tuple[int, int]): The x and y of the region.
+        """
+        left, top = region[0] * CHUNK_SIZE, region[1] * CHUNK_SIZE
+        right, bottom = left + CHUNK_SIZE, top + CHUNK_SIZE
+        sprites = []
+        
+        # Cycle through all the visible layers, and add the tiles of the region to the sprite group
+        for layer in self.tile_map.layers:
+            if not hasattr(layer, "tiles_in"):
+                continue
+            tiles = layer.tiles_in(left, top, right, bottom)
+            
             # Ground layers -----------------------------------------------------------------------------
+            # These layers never change, so they are baked into the camera chunks instead of being sprites
             if layer.name == "Ground":
-                for x, y, surf in layer.tiles():
-                    Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["ground"])
+                for x, y, surf in tiles:
+                    self.all_sprites.add_static(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, z=LAYERS["ground"])
             
             if layer.name == "Paths":
-                for x, y, surf in layer.tiles():
-                    Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["ground_plants"])
+                for x, y, surf in tiles:
+                    self.all_sprites.add_static(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, z=LAYERS["ground_plants"])
         
             if layer.name == "Hills":
-                for x, y, surf in layer.tiles():
-                    Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["ground_plants"])
+                for x, y, surf in tiles:
+                    self.all_sprites.add_static(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, z=LAYERS["ground_plants"])
 
             # bulding layers ----------------------------------------------------------------------------
             if layer.name == "House Floor":
-                for x, y, surf in layer.tiles():
-                    Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["house_bottom"])
+                for x, y, surf in tiles:
+                    self.all_sprites.add_static(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, z=LAYERS["house_bottom"])
             if layer.name == "House Furniture Bottom":
-                for x, y, surf in layer.tiles():
-                    Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["house_bottom"])
+                for x, y, surf in tiles:
+                    sprites.append(Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["house_bottom"]))
             if layer.name == "House Walls":
-                for x, y, surf in layer.tiles():
-                    Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["main"])
+                for x, y, surf in tiles:
+                    sprites.append(Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["main"]))
             if layer.name == "House Furniture Top":
-                for x, y, surf in layer.tiles():
-                    Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["main"])
+                for x, y, surf in tiles:
+                    sprites.append(Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=surf, groups=self.all_sprites, z=LAYERS["main"]))
              
             if layer.name == "Fences":
-                for x, y, surf in layer.tiles():
-                    Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), 
-                         surf=surf, 
-                         groups=[self.all_sprites, self.collision_sprites], 
-                         z=LAYERS["main"])
+                for x, y, surf in tiles:
+                    sprites.append(Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), 
+                                        surf=surf, 
+                                        groups=[self.all_sprites, self.collision_sprites], 
+                                        z=LAYERS["main"]))
                     
             # Water layers ------------------------------------------------------------------------------
+            # All the water tiles show the same frame, so they are baked into animated chunks of one clip
             if layer.name == "Water":
-                water_sprite = pygame.image.load("assets/Tilesets/Water.png").convert_alpha()
-                frame_width = water_sprite.get_width() // 4
-                frame_height = water_sprite.get_height() // 1
-                
-                water_frames = []
-                for col in range(4):
-                    for row in range(1):
-                        frame = water_sprite.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                        water_frames.append(frame)
-                        
-                for x, y, surf in layer.tiles():
-                    Water(pos=(x * TILE_SIZE, y * TILE_SIZE), frames=water_frames, groups=self.all_sprites) 
+                for x, y, surf in tiles:
+                    self.all_sprites.add_animated(pos=(x * TILE_SIZE, y * TILE_SIZE), clip=self.water_clip, z=LAYERS["water"])
             
+            # Collision layer ---------------------------------------------------------------------------
+            if layer.name == "Collision Layer":
+                for x, y, surf in tiles:
+                    sprites.append(Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=self.collision_surface, groups=self.collision_sprites, z=LAYERS["main"]))
+        
+        # Object layers -----------------------------------------------------------------------------------
+        tree_ids = []
+        for layer_name, object_id, obj in self.region_objects.get(region, []):
             # Nature layers -----------------------------------------------------------------------------
-            if layer.name == "Small Plants":
-                for obj in layer:
-                    WildFlower(pos=(obj.x, obj.y), surf=obj.image, groups=[self.all_sprites, self.collision_sprites])
-            
-            if layer.name == "Hill Objects":
-                for obj in layer:
-                    WildFlower(pos=(obj.x, obj.y), surf=obj.image, groups=[self.all_sprites, self.collision_sprites])
+            if layer_name == "Small Plants" or layer_name == "Hill Objects":
+                sprites.append(WildFlower(pos=(obj.x, obj.y), surf=obj.image, groups=[self.all_sprites, self.collision_sprites]))
                     
-            if layer.name == "Ground Objects":
-                for obj in layer:
-                    Tile(pos=(obj.x, obj.y), surf=obj.image, groups=self.all_sprites, z=LAYERS["ground_plants"])
+            if layer_name == "Ground Objects":
+                sprites.append(Tile(pos=(obj.x, obj.y), surf=obj.image, groups=self.all_sprites, z=LAYERS["ground_plants"]))
                     
-            # Trees (object layer)
-            if layer.name == "Trees":
-                for obj in layer:
-                    Tree(pos=(obj.x, obj.y), 
-                         surf=obj.image, 
-                         groups=[self.all_sprites, self.collision_sprites, self.tree_sprites], 
-                         name=obj.name, 
-                         update_inventory=self.update_inventory)
-            
-            # Player ------------------------------------------------------------------------------------
-            if layer.name == "Player":
-                for obj in layer:
-                    if obj.name == "Spawn":
-                        self.player = Player((obj.x, obj.y), 
-                                             group=self.all_sprites, 
-                                             collision_sprites=self.collision_sprites, 
-                                             trees_sprites=self.tree_sprites, 
-                                             interaction_sprites=self.interaction_sprites,
-                                             soil_layer=self.soil_layer)
-                    if obj.name == "Bed":
-                        Interaction(pos=(obj.x, obj.y), size=(obj.width, obj.height), groups=self.interaction_sprites, name=obj.name)
-                        
-                    if obj.name == "Trade Boat":
-                        pass
-            
-            # Collision layer ---------------------------------------------------------------------------
-            if layer.name == "Collision Layer":
-                for x, y, surf in layer.tiles():
-                    Tile(pos=(x * TILE_SIZE, y * TILE_SIZE), surf=pygame.Surface((TILE_SIZE, TILE_SIZE)), groups=self.collision_sprites, z=LAYERS["main"])      
+            # Trees (they get back the state they had when their region was evicted)
+            if layer_name == "Trees":
+                tree = Tree(pos=(obj.x, obj.y), 
+                            surf=obj.image, 
+                            groups=[self.all_sprites, self.collision_sprites, self.tree_sprites], 
+                            name=obj.name, 
+                            update_inventory=self.update_inventory)
+                if object_id in self.stored_trees:
+                    tree.restore(*self.stored_trees.pop(object_id))
+                self.trees[object_id] = tree
+                tree_ids.append(object_id)
+                sprites.append(tree)
+        
+        self.region_sprites[region] = sprites
+        self.region_trees[region] = tree_ids
+        self.soil_layer.load_region(region)
+        
+    def unload_region(self, region):
+        """
+        Remove the sprites and the camera chunks of a region that was left behind. The state of its trees is
+        kept until the region is loaded again (the soil keeps its own state in its grids).
+
+        Args:
+            region (Tuple[int, int]): The x and y of the region.
+        """
+        for tree_id in self.region_trees.pop(region, []):
+            tree = self.trees.pop(tree_id)
+            self.stored_trees[tree_id] = (tree.health, tree.alive, tree.apple_slots())
+            for apple in tree.apple_sprites.sprites():
+                apple.kill()
+        for sprite in self.region_sprites.pop(region, []):
+            sprite.kill()
+        self.all_sprites.remove_chunk(region)
+        self.soil_layer.unload_region(region)
+        
+    def tree_states(self):
+        """
+        Get the state of every tree that was loaded at some point (the others were never touched).
 
+        Returns:
+            Dict[int, Tuple[int, bool, int | None]]: The health, alive and apple slots of each tree, by id.
+        """
+        states = dict(self.stored_trees)
+        states.update({tree_id: (tree.health, tree.alive, tree.apple_slots()) for tree_id, tree in self.trees.items()})
+        return states
+    
+    def restore_trees(self, states):
+        """
+        Put back the saved state of the trees. The trees of the loaded regions change right away, the others
+        when their region is loaded.
+
+        Args:
+            states (Dict[int, Tuple[int, bool, int | None]]): The health, alive and apple slots of each tree, by id.
+        """
+        for tree_id, state in states.items():
+            if tree_id in self.trees:
+                self.trees[tree_id].restore(*state)
+            else:
+                self.stored_trees[tree_id] = state
+        
+    def unload(self):
+        """
+        Release the sprites and surfaces of the level, when the game leaves it. An autosave in progress is
+        written first.
+        """
+        if self.saver is not None:
+            self.saver.flush(timeout=5)
+            self.report_save_error()
+        for group in [self.collision_sprites, self.tree_sprites, self.interaction_sprites, self.update_sprites,
+                      self.soil_layer.plant_sprites]:
+            group.empty()
+        self.all_sprites.release()
+        self.animation_clock.clips.clear()
+        self.tint.surfaces.clear()
+        
+        # The timers of the sprites that were just released must not fire anymore
+        scheduler.clear()
+        game_clock.reset()
+        
+    def report_save_error(self):
+        """
+        Tell the player if the last autosave could not be written. The game goes on, and the next one tries again.
+        """
+        error = self.saver.take_error()
+        if error is not None:
+            print(f"The game could not be saved to {self.save_path}: {error}", file=sys.stderr)
+            self.overlay.show_message("The game could not be saved")
+        
     def crop_collision(self):
         """
-        Check if the player is colliding with a fully grown crop, and if so, update the inventory and remove the crop.
+        Check if the player is over a fully grown crop, and if so, update the inventory and remove the crop.
         """
-        if self.soil_layer.plant_sprites:
-            for plant in self.soil_layer.plant_sprites.sprites():
-                if plant.rect.colliderect(self.player.hitbox) and plant.grown:
-                    self.update_inventory(plant.type)
-                    plant.kill()
-                    Particle(plant.rect.topleft, plant.image, self.all_sprites, z=LAYERS["main"])
-                    
-                    y = plant.rect.centery // TILE_SIZE
-                    x = plant.rect.centerx // TILE_SIZE
-                    self.soil_layer.grid[y][x].remove("Planted")
+        for plant in self.soil_layer.harvest(self.player.hitbox):
+            self.update_inventory(plant.type)
+            plant.kill()
+            Particle(plant.rect.topleft, plant.image, self.all_sprites, z=LAYERS["main"])
     
     def update_inventory(self, item):
         """
@@ -214,94 +375,75 @@ class Level:
                 for apple in tree.apple_sprites.sprites():
                     apple.kill()
                 tree.create_fruit()
+        for tree_id, (health, alive, slots) in self.stored_trees.items():
+            if alive:
+                self.stored_trees[tree_id] = (health, alive, None)  # They grow new apples when they are loaded
+        
+        # Autosave: only the copy of the state is made here
+        if self.saver is not None:
+            self.saver.save(Snapshot.capture(self))
     
-    def run(self, dt):
+    def update(self, dt):
         """
-        Run the level.
+        Advance the simulation of the level by one fixed step.
 
         Args:
-            dt (int): The time since the last frame in milliseconds
+            dt (int): The time step in seconds
         """
-        self.display_surface.fill((0, 0, 0))
-        self.all_sprites.custom_draw(self.player)
-        # Calls update method on all sprites in the group
-        self.all_sprites.update(dt)  
-        self.overlay.display()
+        profiler = self.profiler
+        profiler.resume()
+        profiler.input(self.controls.get_pressed())
+        
+        # Calls update method only on the sprites that need it (most sprites never change)
+        self.update_sprites.update(dt)
+        self.streamer.update(self.player.pos)  # Regions around the player, a few per step
+        self.animation_clock.update(dt)
+        scheduler.update()  # Fires the timers and expirations that are due
+        profiler.mark("update")
         
         self.crop_collision()
+        profiler.mark("crops")
         
         self.day.update(dt)
+        profiler.mark("day")
         
-        if self.raining:
-            self.rain.update()
+        self.rain.update(dt, self.raining)  # Drops left from a rain that stopped still fade out
+        profiler.mark("rain")
         
         if self.player.asleep:
             self.transition.play()
-            
-        #print(self.player.item_inventory)
-
-class CameraGroup(pygame.sprite.Group):
-    """
-    A custom sprite group that handles drawing sprites with a camera offset and zoom applied.
-    """
-    def __init__(self):
-        super().__init__()
-        self.display_surface = pygame.display.get_surface()
-        self.offset = pygame.math.Vector2(0, 0)
-        self.zoom = 3.0  # Default zoom level
+        if self.saver is not None and self.saver.error is not None:  # Set by the thread of the autosave
+            self.report_save_error()
+        profiler.mark("transition")
         
-    def custom_draw(self, player):
+    def draw(self, alpha=1.0):
         """
-        Draw the sprites in the group with the camera offset and zoom applied.
+        Draw the level. The moving sprites are drawn between their last two simulated positions.
 
         Args:
-            player (Player): The player object (the reference point for the camera)
-        """
-        # Calculate the scaled screen dimensions
-        scaled_width = SCREEN_WIDTH // self.zoom
-        scaled_height = SCREEN_HEIGHT // self.zoom
-        
-        self.offset.x = player.rect.centerx - scaled_width // 2
-        self.offset.y = player.rect.centery - scaled_height // 2
-        
-        # Create a scaled surface for drawing sprites with the zoom applied
-        scaled_surface = pygame.Surface((scaled_width, scaled_height))
-        
-        for layer in LAYERS.values():  # Cycle through all the layers
-            # Sort sprites by y value, so they are drawn in the correct order relative to the player
-            for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery): 
-                if sprite.z == layer:  # Draw the sprite on the display surface according to its z value
-                    # Apply the offset and zoom to the sprite
-                    offset_rect = sprite.rect.copy()
-                    offset_rect.center -= self.offset
-                    scaled_sprite_image = pygame.transform.scale(sprite.image, (int(sprite.rect.width), int(sprite.rect.height)))
-                    scaled_surface.blit(scaled_sprite_image, offset_rect)
-                    
-                    # if sprite == player:
-                    #     # Draw the player's hitbox and target position
-                    #     pygame.draw.rect(scaled_surface, (255, 0, 0), offset_rect, 1)
-                    #     hitbox_rect = player.hitbox.copy()
-                    #     hitbox_rect.center = offset_rect.center
-                    #     pygame.draw.rect(scaled_surface, (0, 255, 0), hitbox_rect, 1)
-                    #     target_pos = offset_rect.center + PLAYER_TOOL_OFFSET[player.status.split('_')[0]]
-                    #     pygame.draw.circle(scaled_surface, (0, 0, 255), target_pos, 2)
-
-        # Scale the scaled_surface to fit the display surface
-        zoomed_surface = pygame.transform.scale(scaled_surface, (SCREEN_WIDTH, SCREEN_HEIGHT))
+            alpha (float): How far the render time is between the last two simulation steps (0 to 1)
+        """
+        profiler = self.profiler
+        profiler.resume()
+        
+        self.all_sprites.custom_draw(self.player, alpha)  # Covers the whole display
+        profiler.mark("draw")
+        self.overlay.display()
+        profiler.mark("overlay")
+        
+        self.tint.apply(self.day.day_color, self.transition.color)
+        profiler.mark("tint")
+        
+        profiler.end_frame()  # Drawn last, so the day tint does not darken it
+        
+    def run(self, dt):
+        """
+        Run the level: one simulation step followed by a draw.
 
-        # Draw the zoomed surface on the display surface
-        self.display_surface.blit(zoomed_surface, (0, 0))
-        
-    def custom_draw_no_zoom(self, player):
-        # Player always stays in the center of the screen
-        self.offset.x = player.rect.centerx - SCREEN_WIDTH // 2
-        self.offset.y = player.rect.centery - SCREEN_HEIGHT // 2
-        
-        for layer in LAYERS.values():  # Cycle through all the layers
-            # Sort sprites by y value, so they are drawn in the correct order relative to the player
-            for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):  
-                if sprite.z == layer:  # Draw the sprite on the display surface according to its z value
-                    # Apply the offset to the sprite
-                    offset_rect = sprite.rect.copy()
-                    offset_rect.center -= self.offset
-                    self.display_surface.blit(sprite.image, offset_rect)
+        Args:
+            dt (int): The time since the last frame in seconds
+        """
+        self.update(dt)
+        self.draw()
+            
+        #print(self.player.item_inventory)
\ No newline at end of file
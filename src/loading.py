@@ -0,0 +1,30 @@
+import pygame
+from settings import *
+
+
+class LoadingScreen:
+    """
+    Screen shown while the game is still being loaded: a title and a progress bar.
+    """
+    def __init__(self):
+        self.display_surface = pygame.display.get_surface()
+        self.font = pygame.font.Font(None, 36)
+        self.text_surface = self.font.render("Loading", False, (255, 255, 255))
+        self.text_rect = self.text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 30))
+        self.bar_rect = pygame.Rect(0, 0, 400, 16)
+        self.bar_rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 10)
+
+    def draw(self, progress):
+        """
+        Draw the loading screen.
+
+        Args:
+            progress (float): The fraction of the game loaded so far (from 0 to 1).
+        """
+        self.display_surface.fill((0, 0, 0))
+        self.display_surface.blit(self.text_surface, self.text_rect)
+        pygame.draw.rect(self.display_surface, (255, 255, 255), self.bar_rect, 2)
+
+        filled = self.bar_rect.inflate(-6, -6)
+        filled.width = round(filled.width * min(max(progress, 0.0), 1.0))
+        pygame.draw.rect(self.display_surface, (255, 255, 255), filled)
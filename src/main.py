@@ -1,51 +1,211 @@
 import pygame
 from settings import *
 from level import Level
-from menu import Menu
+from menu import Menu, preload_background, background_ready
+from timer import game_clock
+from controls import KeyboardInput
+from loading import LoadingScreen
+from scenes import SceneManager
+from tilemap import preload_map, map_ready
+import assets
 
+import argparse
+import hashlib
+import os
+import random
 import sys
-from random import randint
+from concurrent.futures import ThreadPoolExecutor
 
 
 class Game:
-    """ 
+    """
     Main class of the game. It is responsible for the game loop and the game states.
     """
-    def __init__(self):
+    def __init__(self, headless=False, seed=None, controls=None, fps=FPS_CAP):
+        # Headless runs have no window: they use the dummy video driver, a simulated clock and a seeded RNG
+        self.headless = headless
+        if self.headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+        if seed is not None:
+            random.seed(seed)
+
         pygame.init()
-        self.clock = pygame.time.Clock() 
+        self.clock = pygame.time.Clock()
+        self.fps = fps  # Frame cap of the drawing (0 means no cap)
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Sprout Lands")
+
+        self.game_clock = game_clock
+        if self.headless:
+            self.game_clock.simulate()
+        self.controls = controls if controls is not None else KeyboardInput()
+
+        # Scenes: built when they are needed, a slice at a time, and released when they are left -------
+        # The files are read on worker threads first (they are left to finish on their own)
+        loader = ThreadPoolExecutor(max_workers=LOADER_WORKERS, thread_name_prefix="loader")
+        assets.preload(loader)
+        preload_map("data/tmx/map.tmx", loader)
+        preload_background("data/tmx/map.tmx", loader)
+        loader.shutdown(wait=False)
         
-        # Game states -----------------------------------------------------------------------------------
-        self.state = "menu"
-        self.menu = Menu()
-        self.level = Level()
-        
+        self.loading_screen = LoadingScreen()
+        self.scene_report = False  # Print the report of the scenes when the game is closed
+        self.scenes = SceneManager({"menu": self.build_menu, "level": self.build_level})
+        self.scenes.switch("level" if self.headless else "menu")  # Headless runs go straight to the level
+        if self.headless:
+            self.scenes.step(None)  # Headless runs are loaded at once
+
+    @property
+    def menu(self):
+        """
+        Menu | None: The menu, if it is built.
+        """
+        return self.scenes.get("menu")
+
+    @property
+    def level(self):
+        """
+        Level | None: The level, if it is built.
+        """
+        return self.scenes.get("level")
+
+    def build_menu(self):
+        """
+        Build the menu, once the map and the saved menu background were read.
+
+        Yields:
+            float: The fraction of the menu built so far.
+
+        Returns:
+            Menu: The menu.
+        """
+        while not map_ready("data/tmx/map.tmx") or not background_ready():
+            yield 0.0
+        return Menu()
+
+    def build_level(self):
+        """
+        Build the level, a slice at a time.
+
+        Yields:
+            float: The fraction of the level built so far.
+
+        Returns:
+            Level: The level.
+        """
+        level = Level(self.controls, save_path=None if self.headless else SAVE_FILE, build=False)  # Headless runs start from scratch
+        yield from level.build()
+        return level
+
+    def quit(self):
+        """
+        Close the game. The level is released first, so an autosave in progress can finish.
+        """
+        if self.level is not None:
+            self.scenes.unload("level")
+        if self.scene_report:
+            print(self.scenes.report())
+        pygame.quit()
+        sys.exit()
+
     def run(self):
         """
-        Main game loop. It is responsible for the event management, game states and the delta time.
+        Main game loop. It is responsible for the event management and the game states. The level is simulated
+        with a fixed time step, as many steps as the real time asks for, and drawn once per frame.
         """
+        accumulator = 0.0  # Real time not simulated yet
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-            
-            # Using delta time to make the game be frame rate independent
-            dt = self.clock.tick() / 1000  
-            
+                    self.quit()
+
+            # Time since the last frame (the frame cap makes the loop sleep instead of burning the CPU)
+            frame_time = min(self.clock.tick(self.fps) / 1000, MAX_FRAME_TIME)
+
             # Switching between game states (screens, scenes etc.)
-            if self.menu.state == "level":
-                self.state = "level"
-            if self.state == "menu":
-                self.menu.run(dt)
-            if self.state == "level":
-                self.level.run(dt)
-                
-            pygame.display.update()
+            if self.scenes.current == "menu":
+                self.scenes.preload("level")  # Built while the menu is shown
+                if self.menu.state == "level":
+                    self.scenes.switch("level")
+            if self.scenes.loading:
+                self.scenes.step(LOAD_BUDGET)
+            self.scenes.update()
+
+            if self.scenes.switching:
+                self.loading_screen.draw(self.scenes.progress.get(self.scenes.target, 0.0))  # Not built yet
+                pygame.display.update()
+            elif self.scenes.current == "menu":
+                pygame.display.update(self.menu.run(frame_time))  # Only the parts of the screen that changed
+            elif self.scenes.current == "level":
+                accumulator += frame_time
+                while accumulator >= SIMULATION_STEP:
+                    self.level.update(SIMULATION_STEP)
+                    accumulator -= SIMULATION_STEP
+                self.level.draw(accumulator / SIMULATION_STEP)
+                pygame.display.update()
+
+    def simulate(self, frames, dt=SIMULATION_STEP):
+        """
+        Run the level for a number of frames as fast as possible, with a fixed time step. With the same seed and
+        input script, the results are always the same.
+
+        Args:
+            frames (int): The number of frames to run.
+            dt (float): The simulated time of each frame in seconds.
+
+        Returns:
+            dict: A summary of the state of the level after the last frame.
+        """
+        for frame in range(frames):
+            pygame.event.pump()
+            self.level.run(dt)
+            self.game_clock.advance(dt * 1000)
+            self.controls.advance()
+
+        return self.summary()
+
+    def summary(self):
+        """
+        Summarize the state of the level, with a digest that changes if anything in the simulation changes.
+
+        Returns:
+            dict: The player position and inventory, the number of sprites and the digest.
+        """
+        player = self.level.player
+        soil = self.level.soil_layer
+        digest = hashlib.sha1()
+        digest.update(repr((tuple(player.pos), sorted(player.item_inventory.items()), self.level.raining)).encode())
+        digest.update(repr([(tree.health, len(tree.apple_sprites)) for tree in self.level.tree_sprites]).encode())
+        digest.update(soil.grid.tobytes() + soil.crops.tobytes() + soil.ages.tobytes())
+
+        return {"position": [player.pos.x, player.pos.y],
+                "inventory": player.item_inventory,
+                "sprites": len(self.level.all_sprites),
+                "digest": digest.hexdigest()}
 
 
 if __name__ == '__main__':
-    game = Game()
-    game.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Sprout Lands")
+    parser.add_argument("--headless", action="store_true", help="run the level without a window, as fast as possible")
+    parser.add_argument("--frames", type=int, default=600, help="number of frames of a headless run")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the random number generator")
+    parser.add_argument("--dt", type=float, default=SIMULATION_STEP, help="simulated seconds per frame of a headless run")
+    parser.add_argument("--script", default=None, help="json file with the keys pressed during a headless run")
+    parser.add_argument("--fps", type=int, default=FPS_CAP, help="frame cap of the drawing (0 means no cap)")
+    parser.add_argument("--scene-report", action="store_true", help="print the load time and memory of each scene at the end")
+    args = parser.parse_args()
+
+    if args.headless:
+        controls = None
+        if args.script is not None:
+            from controls import ScriptedInput
+            controls = ScriptedInput.from_file(args.script)
+        game = Game(headless=True, seed=args.seed, controls=controls)
+        print(game.simulate(args.frames, args.dt))
+        if args.scene_report:
+            print(game.scenes.report())
+    else:
+        game = Game(seed=args.seed, fps=args.fps)
+        game.scene_report = args.scene_report
+        game.run()
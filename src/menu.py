@@ -1,9 +1,168 @@
 import pygame
-from sprites import Water
 from settings import *
-from timer import Timer
+from timer import Timer, scheduler
+from animation import AnimationClock
+import assets
 
-from pytmx.util_pygame import load_pygame
+import os
+import struct
+import zlib
+
+from tilemap import load_map, map_sources, files_signature
+from storage import write_atomically
+
+
+MENU_BACKGROUND_MAGIC = b"SLMBG"
+MENU_BACKGROUND_VERSION = 1
+MENU_BACKGROUND_HEADER = struct.Struct("<5sHq40sHHB")  # Magic, version, sources mtime and hash, width, height, frames
+
+reading_backgrounds = {}  # {cache path: Future}, menu backgrounds being read by a worker thread
+
+
+def background_sources(map_path):
+    """
+    Get the files the menu background is made of: the map files and the images of the water and the title.
+
+    Args:
+        map_path (string): The path of the tmx file.
+
+    Returns:
+        List[string]: The paths of the files.
+    """
+    return map_sources(map_path) + [assets.SHEETS["water"][0], assets.SHEETS["title"][0]]
+
+
+def render_background(map_path):
+    """
+    Render every frame of the menu background: the water of the map (at twice its size) and the title.
+
+    Args:
+        map_path (string): The path of the tmx file.
+
+    Returns:
+        List[pygame.Surface]: The frames, as big as the screen.
+    """
+    water_frames = assets.frames("menu_water")
+    title_surface = assets.frame("title")
+    title_rect = title_surface.get_rect(center=(SCREEN_WIDTH // 2, (SCREEN_HEIGHT // 2)-150))
+    
+    visible = (0, 0, -(-SCREEN_WIDTH // (TILE_SIZE * 2)), -(-SCREEN_HEIGHT // (TILE_SIZE * 2)))  # The rest of the map is never seen
+    positions = [(x * TILE_SIZE * 2, y * TILE_SIZE * 2) for x, y, surface in load_map(map_path).get_layer_by_name("Water").tiles_in(*visible)]
+    
+    frames = []
+    for water in water_frames:
+        frame = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        frame.fill((0, 0, 0))
+        frame.blits([(water, pos) for pos in positions], False)
+        frame.blit(title_surface, title_rect)
+        frames.append(frame)
+    return frames
+
+
+def read_background_cache(map_path, cache_path, convert=True):
+    """
+    Read the frames of the menu background saved by an earlier run. They are only used if they were rendered
+    from the current version of the files, for the current screen size.
+
+    Args:
+        map_path (string): The path of the tmx file.
+        cache_path (string): The path of the saved frames.
+        convert (bool): Convert the frames to the display format (only the main thread should do it).
+
+    Returns:
+        List[pygame.Surface] | None: The frames, or None if there is no valid copy.
+    """
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path, "rb") as file:
+        data = file.read()
+    if len(data) < MENU_BACKGROUND_HEADER.size:
+        return None
+    
+    magic, version, mtime, digest, width, height, count = MENU_BACKGROUND_HEADER.unpack_from(data)
+    if magic != MENU_BACKGROUND_MAGIC or version != MENU_BACKGROUND_VERSION or (width, height) != (SCREEN_WIDTH, SCREEN_HEIGHT):
+        return None
+    sources = background_sources(map_path)
+    if mtime != max(os.stat(source).st_mtime_ns for source in sources) and digest.decode() != files_signature(sources)[1]:
+        return None
+    try:
+        pixels = zlib.decompress(data[MENU_BACKGROUND_HEADER.size:])
+    except zlib.error:
+        return None
+    
+    size = width * height * 3
+    if len(pixels) != size * count:
+        return None
+    frames = [pygame.image.frombytes(pixels[index * size:(index + 1) * size], (width, height), "RGB") for index in range(count)]
+    return [frame.convert() for frame in frames] if convert else frames
+
+
+def write_background_cache(map_path, cache_path, frames):
+    """
+    Save the frames of the menu background for the next runs. It is written to a temporary file first, so a
+    crash never leaves a broken copy behind.
+
+    Args:
+        map_path (string): The path of the tmx file.
+        cache_path (string): The path of the saved frames.
+        frames (List[pygame.Surface]): The frames.
+    """
+    mtime, digest = files_signature(background_sources(map_path))
+    header = MENU_BACKGROUND_HEADER.pack(MENU_BACKGROUND_MAGIC, MENU_BACKGROUND_VERSION, mtime, digest.encode(),
+                                         SCREEN_WIDTH, SCREEN_HEIGHT, len(frames))
+    pixels = zlib.compress(b"".join(pygame.image.tobytes(frame, "RGB") for frame in frames), 1)
+    write_atomically(cache_path, header, pixels)
+
+
+def preload_background(map_path, executor, cache_path=MENU_BACKGROUND_FILE):
+    """
+    Start reading the saved frames of the menu background on a worker thread (reading, decompressing and
+    checking them). They are converted on the main thread when they are requested.
+
+    Args:
+        map_path (string): The path of the tmx file.
+        executor (concurrent.futures.Executor): The worker threads.
+        cache_path (string): The path of the saved frames.
+    """
+    if cache_path not in reading_backgrounds:
+        reading_backgrounds[cache_path] = executor.submit(read_background_cache, map_path, cache_path, False)
+
+
+def background_ready(cache_path=MENU_BACKGROUND_FILE):
+    """
+    Check if the menu background can be requested without waiting for a worker thread.
+
+    Args:
+        cache_path (string): The path of the saved frames.
+
+    Returns:
+        bool: True if the frames are not being read by a worker thread anymore.
+    """
+    return cache_path not in reading_backgrounds or reading_backgrounds[cache_path].done()
+
+
+def load_background(map_path, cache_path=MENU_BACKGROUND_FILE):
+    """
+    Get the frames of the menu background. They are rendered only when there is no valid copy on disk.
+
+    Args:
+        map_path (string): The path of the tmx file.
+        cache_path (string): The path of the saved frames.
+
+    Returns:
+        List[pygame.Surface]: The frames, as big as the screen.
+    """
+    reading = reading_backgrounds.pop(cache_path, None)
+    frames = reading.result() if reading is not None else read_background_cache(map_path, cache_path, False)
+    if frames is not None:
+        frames = [frame.convert() for frame in frames]
+    else:
+        frames = render_background(map_path)
+        try:
+            write_background_cache(map_path, cache_path, frames)
+        except OSError:
+            pass  # Rendered again on the next run
+    return frames
 
 
 class Buttons(pygame.sprite.Sprite):
@@ -22,7 +181,12 @@ class Menu:
     """
     def __init__(self):
         self.display_surface = pygame.display.get_surface()  # Get the surface of the display (same as screen on main.py)
-        self.menu_sprites = pygame.sprite.Group()
+        self.animation_clock = AnimationClock()
+        self.background_clip = None  # The water and the title, pre-rendered into one image per frame
+        
+        # What is on the screen, so only the parts that change are drawn again
+        self.shown_frame = None
+        self.shown_buttons = []
         
         # Menu states -----------------------------------------------------------------------------------
         self.play = False
@@ -33,9 +197,6 @@ class Menu:
         self.timer = Timer(300)
         
         # Importing the assets --------------------------------------------------------------------------
-        self.title_surface = pygame.image.load("assets/Title_tr.png").convert_alpha()
-        self.title_rect = self.title_surface.get_rect(center=(SCREEN_WIDTH // 2, (SCREEN_HEIGHT // 2)-150))
-        
         self.play_button_frames = []
         self.play_button_index = 0
         self.config_button_frames = []
@@ -57,51 +218,16 @@ class Menu:
     def import_assets(self):
         """
         Importing the assets for the menu screen. Each buttoon has two frames that comes from a sprite sheet with several buttons.
-        The menu background is a tilemap.
+        The menu background is a tilemap, rendered once per frame of the water animation and kept on disk.
         """
         
         # Importing the background water animation ------------------------------------------------------
-        water_sprite = pygame.image.load("assets/Tilesets/Water.png").convert_alpha()
-        frame_width = water_sprite.get_width() // 4
-        frame_height = water_sprite.get_height() // 1
-        
-        water_frames = []
-        for col in range(4):
-            for row in range(1):
-                frame = water_sprite.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                frame = pygame.transform.scale(frame, (2*TILE_SIZE, 2*TILE_SIZE))
-                water_frames.append(frame)
-        
-        for x, y, surface in load_pygame("data/tmx/map.tmx").get_layer_by_name("Water").tiles():     
-            Water(pos=(x * TILE_SIZE * 2, y * TILE_SIZE * 2), frames=water_frames, groups=self.menu_sprites) 
+        self.background_clip = self.animation_clock.clip(load_background("data/tmx/map.tmx"), speed=2)
                     
-        # Importing the Play button ---------------------------------------------------------------------
-        play_button_sheet = pygame.image.load("assets/Sprite sheets UI/Basic UI/UI Big Play Button.png").convert_alpha()
-        frame_width = play_button_sheet.get_width() // 2
-        frame_height = play_button_sheet.get_height() // 2
-        
-        for col in range(2):
-            for row in range(2):
-                frame = play_button_sheet.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                frame = pygame.transform.scale(frame, (frame_width*3, frame_height*3))
-                if row == 1:
-                    self.play_button_frames.append(frame)
-                    
-        # Importing the Config and Info buttons ---------------------------------------------------------           
-        config_button_sheet = pygame.image.load("assets/Sprite sheets UI/Basic UI/Config_btn.png").convert_alpha()
-        info_button_sheet = pygame.image.load("assets/Sprite sheets UI/Basic UI/Info_btn.png").convert_alpha()
-        frame_width = config_button_sheet.get_width() // 2
-        frame_height = config_button_sheet.get_height() // 1
-        
-        for col in range(2):
-            for row in range(1):
-                frame = config_button_sheet.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                frame = pygame.transform.scale(frame, (frame_width*3, frame_height*3))
-                self.config_button_frames.append(frame)
-                
-                frame = info_button_sheet.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                frame = pygame.transform.scale(frame, (frame_width*3, frame_height*3))
-                self.info_button_frames.append(frame)
+        # Importing the buttons -------------------------------------------------------------------------
+        self.play_button_frames = assets.frames("play_button")
+        self.config_button_frames = assets.frames("config_button")
+        self.info_button_frames = assets.frames("info_button")
                     
     def menu_input(self):
         """
@@ -160,22 +286,65 @@ class Menu:
             self.info = False
             self.state = "info"
     
+    def unload(self):
+        """
+        Release the surfaces of the menu, when the game leaves it. The frames that only the menu uses are
+        dropped from the asset cache too.
+        """
+        self.background_clip = None
+        self.animation_clock.clips.clear()
+        self.play_button_frames = []
+        self.config_button_frames = []
+        self.info_button_frames = []
+        assets.release("menu_water", "title", "play_button", "config_button", "info_button")
+    
+    def draw(self, frame):
+        """
+        Draw the parts of the menu that changed since the last frame: the whole screen when the water moves,
+        only the buttons that were pressed or released otherwise.
+
+        Args:
+            frame (int): The frame of the background to be shown.
+
+        Returns:
+            List[pygame.Rect]: The parts of the screen that changed.
+        """
+        background = self.background_clip.frames[frame]
+        buttons = [(self.play_button_surface, self.play_button_rect),
+                   (self.config_button_surface, self.config_button_rect),
+                   (self.info_button_surface, self.info_button_rect)]
+        
+        if frame != self.shown_frame:
+            self.display_surface.blit(background, (0, 0))
+            self.display_surface.blits(buttons, False)
+            self.shown_frame = frame
+            self.shown_buttons = [surface for surface, rect in buttons]
+            return [self.display_surface.get_rect()]
+        
+        dirty = []
+        for index, (surface, rect) in enumerate(buttons):
+            if surface is not self.shown_buttons[index]:
+                self.display_surface.blit(background, rect, rect)  # The buttons do not overlap each other
+                self.display_surface.blit(surface, rect)
+                self.shown_buttons[index] = surface
+                dirty.append(rect)
+        return dirty
+    
     def run(self, dt):
         """
         Running the menu screen.
 
         Args:
             dt (int): The time since the last frame.
+
+        Returns:
+            List[pygame.Rect]: The parts of the screen that changed (to be updated on the display).
         """
-        self.display_surface.fill((0, 0, 0))
-        self.menu_sprites.draw(self.display_surface)
-        self.menu_sprites.update(dt)
+        frame = self.background_clip.frame
+        self.animation_clock.update(dt)
         
         self.menu_input()
-        self.timer.update()
+        scheduler.update()  # Fires the timers that are done
         self.change_state()
         
-        self.display_surface.blit(self.title_surface, self.title_rect)
-        self.display_surface.blit(self.play_button_surface, self.play_button_rect)
-        self.display_surface.blit(self.config_button_surface, self.config_button_rect)
-        self.display_surface.blit(self.info_button_surface, self.info_button_rect)
\ No newline at end of file
+        return self.draw(frame)
\ No newline at end of file
@@ -1,5 +1,7 @@
 import pygame
 from settings import *
+from timer import Timer
+import assets
 
 
 class Overlay:
@@ -14,55 +16,49 @@ class Overlay:
         self.seeds_surfaces = {seed:None for seed in player.seeds}  # Getting the seeds from the player
         self.import_assets()
         
+        # Messages for the player (like a save that failed)
+        self.font = pygame.font.Font(None, 28)
+        self.message_surface = None
+        self.message_timer = Timer(OVERLAY_MESSAGE_TIME)
+        
     def import_assets(self):
         """
-        Import the assets for the overlay from their respective spritesheets.
+        Import the assets for the overlay (tools and seeds icons).
         """
         
-        # Importing the tools ---------------------------------------------------------------------------
-        basic_tools_materials = pygame.image.load('assets/Sprite sheets UI/Basic UI/Tools_ui.png').convert_alpha()
-        frame_width = basic_tools_materials.get_width() // 3
-        frame_height = basic_tools_materials.get_height() // 2
- 
-        for row in range(2):
-            for col in range(3):
-                # Get the frame from the spritesheet
-                frame = basic_tools_materials.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                if row == 0:
-                    if col == 2 and 'water' in self.player.tools:
-                        self.tools_surfaces['water'] = frame
-                    if col == 1 and 'hoe' in self.player.tools:
-                        self.tools_surfaces['hoe'] = frame
-                if row == 1:
-                    if col == 0 and 'axe' in self.player.tools:
-                        self.tools_surfaces['axe'] = frame
-                    
-        # Importing the seeds ---------------------------------------------------------------------------
-        basic_plants = pygame.image.load('assets/Objects/Basic Plants.png').convert_alpha()
-        frame_width = basic_plants.get_width() // 6
-        frame_height = basic_plants.get_height() // 2
+        for tool in self.tools_surfaces.keys():
+            self.tools_surfaces[tool] = assets.frame(f"{tool}_icon")
+        for seed in self.seeds_surfaces.keys():
+            self.seeds_surfaces[seed] = assets.frame(f"{seed}_seed")
+        
+        # The icons are scaled once here instead of on every frame
+        for tool, surface in self.tools_surfaces.items():
+            self.tools_surfaces[tool] = pygame.transform.scale(surface, (70, 70))
+        for seed, surface in self.seeds_surfaces.items():
+            self.seeds_surfaces[seed] = pygame.transform.scale(surface, (50, 50))
         
-        for row in range(2):
-            for col in range(6):
-                # Get the frame from the spritesheet
-                frame = basic_plants.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                if row == 0:
-                    if col == 0 and 'corn' in self.player.seeds:
-                        self.seeds_surfaces['corn'] = frame
-                if row == 1:
-                    if col == 0 and 'tomato' in self.player.seeds:
-                        self.seeds_surfaces['tomato'] = frame
+    def show_message(self, text):
+        """
+        Show a message at the top of the screen for a few seconds.
+
+        Args:
+            text (string): The message.
+        """
+        self.message_surface = self.font.render(text, False, (255, 255, 255))
+        self.message_timer.activate()
         
     def display(self):
         """
         Display the overlay on the screen.
         """
         tool_surface = self.tools_surfaces[self.player.selected_tool]
-        tool_surface = pygame.transform.scale(tool_surface, (70, 70))
         tool_rect = tool_surface.get_rect(midbottom=OVERLAY_POS['tools'])
         self.display_surface.blit(tool_surface, tool_rect)
         
         seed_surface = self.seeds_surfaces[self.player.selected_seed]
-        seed_surface = pygame.transform.scale(seed_surface, (50, 50))
         seed_rect = seed_surface.get_rect(midbottom=OVERLAY_POS['seeds'])
-        self.display_surface.blit(seed_surface, seed_rect)
\ No newline at end of file
+        self.display_surface.blit(seed_surface, seed_rect)
+        
+        if self.message_timer.active:
+            message_rect = self.message_surface.get_rect(midtop=OVERLAY_POS['message'])
+            self.display_surface.blit(self.message_surface, message_rect)
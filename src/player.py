@@ -1,13 +1,14 @@
 import pygame, sys
 from settings import *
 from timer import Timer
+import assets
 
 
 class Player(pygame.sprite.Sprite):
     """
     Class for the player object. A player object can move, use tools and seeds, and interact with other objects.
     """
-    def __init__(self, pos, group, collision_sprites, trees_sprites, interaction_sprites, soil_layer):
+    def __init__(self, pos, group, collision_sprites, trees_sprites, interaction_sprites, soil_layer, controls):
         super().__init__(group)  # The object will be added to the group
         
         # Image and animation ---------------------------------------------------------------------------
@@ -19,12 +20,14 @@ class Player(pygame.sprite.Sprite):
         self.image = self.animations[self.status][self.frame_index]
         self.rect = self.image.get_rect(center = pos)
         self.z = LAYERS['main']
+        self.dynamic = True  # The camera keeps track of its position
         
         # Movement --------------------------------------------------------------------------------------
         self.direction = pygame.math.Vector2(0, 0)
         
         # pos can store floats (differently from rect.x and rect.y)
         self.pos = pygame.math.Vector2(self.rect.center)  
+        self.previous_pos = pygame.math.Vector2(self.pos)  # Position in the last simulation step (for the drawing)
         self.speed = 50
         
         # Timers ----------------------------------------------------------------------------------------
@@ -54,6 +57,7 @@ class Player(pygame.sprite.Sprite):
         self.interaction_sprites = interaction_sprites
         self.asleep = False
         self.soil_layer = soil_layer
+        self.controls = controls  # Keyboard, or a scripted input in headless runs
         
     def import_assets(self):
         """
@@ -65,81 +69,11 @@ class Player(pygame.sprite.Sprite):
                            'up_axe': [], 'down_axe': [], 'left_axe': [], 'right_axe': [],
                            'up_water': [], 'down_water': [], 'left_water': [], 'right_water': []}
         
-        # Importing player's moviment animations --------------------------------------------------------
-        basic_sprite_sheet = pygame.image.load('assets/Characters/Basic Charakter Spritesheet.png').convert_alpha()
-        frame_width = basic_sprite_sheet.get_width() // 4
-        frame_height = basic_sprite_sheet.get_height() // 4
-        
-        # This variable is used to store the frame of the animation and properly order them
-        frame_1 = None
-        frame_idle = None
-        frame_2 = None
-        frame_3 = None
-        for row in range(4):
-            for col in range(4):
-                # Get the frame from the spritesheet
-                frame = basic_sprite_sheet.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                if col == 0:
-                    frame_1 = frame
-                elif col == 1:
-                    frame_idle = frame
-                elif col == 2:
-                    frame_2 = frame
-                elif col == 3:
-                    frame_3 = frame
-            
-            # Setting the animation frame order        
-            if row == 0:
-                self.animations['down'] = [frame_1, frame_2, frame_1, frame_3]
-                self.animations['down_idle'] = [frame_idle, frame_1]
-            if row == 1:
-                self.animations['up'] = [frame_1, frame_2, frame_1, frame_3]
-                self.animations['up_idle'] = [frame_idle, frame_1]
-            if row == 2:
-                self.animations['left'] = [frame_1, frame_2, frame_1, frame_3]
-                self.animations['left_idle'] = [frame_idle, frame_1]
-            if row == 3:
-                self.animations['right'] = [frame_1, frame_2, frame_1, frame_3]
-                self.animations['right_idle'] = [frame_idle, frame_1]
-                    
-        # Importing player's actions animations ---------------------------------------------------------
-        action_sprite_sheet = pygame.image.load('assets/Characters/Basic Charakter Actions.png').convert_alpha()
-        frame_width = action_sprite_sheet.get_width() // 2
-        frame_height = action_sprite_sheet.get_height() // 12
-        
-        for row in range(12):
-            for col in range(2):
-                # Get the frame from the spritesheet
-                frame = action_sprite_sheet.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                if row == 0:
-                    self.animations['down_hoe'].append(frame)
-                elif row == 1:
-                    self.animations['up_hoe'].append(frame)
-                elif row == 2:
-                    self.animations['left_hoe'].append(frame)
-                elif row == 3:
-                    self.animations['right_hoe'].append(frame)
-                
-                if row == 4:
-                    self.animations['down_axe'].append(frame)
-                elif row == 5:
-                    self.animations['up_axe'].append(frame)
-                elif row == 6:
-                    self.animations['left_axe'].append(frame)
-                elif row == 7:
-                    self.animations['right_axe'].append(frame)
-                    
-                if row == 8:
-                    self.animations['down_water'].append(frame)
-                elif row == 9:
-                    self.animations['up_water'].append(frame)
-                elif row == 10:
-                    self.animations['left_water'].append(frame)
-                elif row == 11:
-                    self.animations['right_water'].append(frame)
+        for status in self.animations.keys():
+            self.animations[status] = assets.frames(f"player_{status}")
         
     def player_input(self):
-        keys = pygame.key.get_pressed()
+        keys = self.controls.get_pressed()
         
         if not self.timers['tool_use'].active and not self.asleep:  # The player can not move while using a tool
             # Directions --------------------------------------------------------------------------------
@@ -210,9 +144,8 @@ class Player(pygame.sprite.Sprite):
             self.soil_layer.hit(self.target_pos)
             
         if self.selected_tool == "axe":
-            for tree in self.tree_sprites.sprites():
-                if tree.rect.collidepoint(self.target_pos):
-                    tree.damage()
+            for tree in self.tree_sprites.at(self.target_pos):
+                tree.damage()
                     
         if self.selected_tool == "water":
             self.soil_layer.water(self.target_pos)
@@ -270,24 +203,24 @@ class Player(pygame.sprite.Sprite):
         Args:
             direction (string): The axis on which the player is moving
         """
-        for sprite in self.collision_sprites.sprites():
-            if hasattr(sprite, 'hitbox'):
-                if self.hitbox.colliderect(sprite.hitbox):
-                    if direction == 'x':  # If the player is moving on the x axis
-                        if self.direction.x > 0:  # If the player is moving right
-                            self.hitbox.right = sprite.hitbox.left
-                        if self.direction.x < 0:  # If the player is moving left
-                            self.hitbox.left = sprite.hitbox.right
-                        self.rect.centerx = self.hitbox.centerx
-                        self.pos.x = self.hitbox.centerx
-                        
-                    if direction == 'y':  # If the player is moving on the y axis
-                        if self.direction.y > 0:  # If the player is moving down
-                            self.hitbox.bottom = sprite.hitbox.top
-                        if self.direction.y < 0:  # If the player is moving up
-                            self.hitbox.top = sprite.hitbox.bottom
-                        self.rect.centery = self.hitbox.centery   
-                        self.pos.y = self.rect.centery
+        # Only the obstacles in the grid cells around the player are checked
+        for sprite in self.collision_sprites.nearby(self.hitbox):
+            if self.hitbox.colliderect(sprite.hitbox):  # A previous obstacle might have pushed the player away
+                if direction == 'x':  # If the player is moving on the x axis
+                    if self.direction.x > 0:  # If the player is moving right
+                        self.hitbox.right = sprite.hitbox.left
+                    if self.direction.x < 0:  # If the player is moving left
+                        self.hitbox.left = sprite.hitbox.right
+                    self.rect.centerx = self.hitbox.centerx
+                    self.pos.x = self.hitbox.centerx
+                    
+                if direction == 'y':  # If the player is moving on the y axis
+                    if self.direction.y > 0:  # If the player is moving down
+                        self.hitbox.bottom = sprite.hitbox.top
+                    if self.direction.y < 0:  # If the player is moving up
+                        self.hitbox.top = sprite.hitbox.bottom
+                    self.rect.centery = self.hitbox.centery   
+                    self.pos.y = self.rect.centery
     
     def update(self, dt):
         """
@@ -296,11 +229,11 @@ class Player(pygame.sprite.Sprite):
         Args:
             dt (int): Time since the last frame
         """
+        self.previous_pos.update(self.pos)
+        
         self.player_input()
         self.set_status()
         
-        for timer in self.timers.values():
-            timer.update()
         self.target_pos = self.rect.center + PLAYER_TOOL_OFFSET[self.status.split('_')[0]]
         
         self.move(dt)
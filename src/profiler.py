@@ -0,0 +1,165 @@
+import pygame
+from settings import *
+from timer import Timer
+
+import csv
+from collections import deque
+from time import perf_counter
+
+
+class FrameProfiler:
+    """
+    Profiler of the stages of a frame, shown as a HUD on top of the game. F3 turns it on and off and F4 exports
+    the timings of the last frames to a CSV file. While it is off, every hook returns right away.
+    """
+    def __init__(self, stages, counters):
+        """
+        Args:
+            stages (List[string]): The names of the stages of a frame, in the order they run.
+            counters (Dict[string, Callable]): Functions that count the sprites of each group, by name.
+        """
+        self.display_surface = pygame.display.get_surface()
+        self.enabled = False
+
+        # Timings ---------------------------------------------------------------------------------------
+        self.stages = stages
+        self.counters = counters
+        self.samples = {stage: deque(maxlen=PROFILER_WINDOW) for stage in stages}  # Rolling window (ms)
+        self.history = deque(maxlen=PROFILER_HISTORY)  # Timings of each frame, for the CSV export
+        self.frame = {}
+        self.frame_count = 0
+        self.last_time = 0
+
+        # HUD -------------------------------------------------------------------------------------------
+        self.font = pygame.font.Font(None, 22)
+        self.lines = []  # The text is rendered again only every few frames
+        self.panel = None
+        self.timers = {'toggle': Timer(200),
+                       'export': Timer(500)}
+
+    def input(self, keys):
+        """
+        Toggle the profiler (F3) and export its timings (F4).
+
+        Args:
+            keys (Sequence[bool]): The pressed state of the keys.
+        """
+        if keys[pygame.K_F3] and not self.timers['toggle'].active:
+            self.timers['toggle'].activate()
+            self.enabled = not self.enabled
+            self.reset()
+            self.resume()
+
+        if keys[pygame.K_F4] and self.enabled and not self.timers['export'].active:
+            self.timers['export'].activate()
+            self.export_csv(PROFILER_CSV)
+
+    def reset(self):
+        """
+        Forget all the timings collected so far.
+        """
+        for samples in self.samples.values():
+            samples.clear()
+        self.history.clear()
+        self.frame = {}
+        self.lines = []
+
+    def resume(self):
+        """
+        Start timing from now. The time since the last stage (like waiting for the next frame) is not counted.
+        """
+        if not self.enabled:
+            return
+        self.last_time = perf_counter()
+
+    def mark(self, stage):
+        """
+        End the timing of a stage (it started when the previous one ended). A stage that runs more than once in a
+        frame (like the simulation steps) adds up its times.
+
+        Args:
+            stage (string): The name of the stage that just ended.
+        """
+        if not self.enabled:
+            return
+        time = perf_counter()
+        self.frame[stage] = self.frame.get(stage, 0.0) + (time - self.last_time) * 1000
+        self.last_time = time
+
+    def end_frame(self):
+        """
+        Store the timings of the frame and draw the HUD.
+        """
+        if not self.enabled:
+            return
+        for stage in self.stages:
+            self.samples[stage].append(self.frame.get(stage, 0.0))
+        self.history.append([self.frame_count] + [self.frame.get(stage, 0.0) for stage in self.stages])
+        self.frame = {}
+        self.frame_count += 1
+
+        if self.frame_count % PROFILER_REFRESH == 0 or not self.lines:
+            self.render()
+        self.draw()
+
+    def statistics(self, stage):
+        """
+        Get the rolling mean and 99th percentile of a stage.
+
+        Args:
+            stage (string): The name of the stage.
+
+        Returns:
+            Tuple[float, float]: The mean and the p99, in milliseconds.
+        """
+        samples = sorted(self.samples[stage])
+        if not samples:
+            return 0.0, 0.0
+        return sum(samples) / len(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+    def render(self):
+        """
+        Render the text of the HUD. Each line is a list of columns: a name and, for the stages, two numbers.
+        """
+        rows = [["stage", "mean", "p99"]]
+        total_mean = total_p99 = 0.0
+        for stage in self.stages:
+            mean, p99 = self.statistics(stage)
+            total_mean += mean
+            total_p99 += p99
+            rows.append([stage, f"{mean:.2f}", f"{p99:.2f}"])
+        rows.append(["total", f"{total_mean:.2f}", f"{total_p99:.2f}"])
+        rows.append([""])
+        rows.extend([f"{name}: {counter()}"] for name, counter in self.counters.items())
+
+        self.lines = [[self.font.render(text, False, (255, 255, 255)) for text in row] for row in rows]
+
+        # Background of the HUD, big enough for the widest line
+        width = max(230, max(line[0].get_width() for line in self.lines) + 20)
+        self.panel = pygame.Surface((width, self.font.get_linesize() * len(self.lines) + 20), pygame.SRCALPHA)
+        self.panel.fill((0, 0, 0, 160))
+
+    def draw(self):
+        """
+        Draw the HUD on the top left corner of the screen (the numbers are aligned to the right of their column).
+        """
+        line_height = self.font.get_linesize()
+        blits = [(self.panel, (10, 10))]
+        for i, line in enumerate(self.lines):
+            y = 20 + i * line_height
+            blits.append((line[0], (20, y)))
+            for column, surface in enumerate(line[1:], start=1):
+                blits.append((surface, (110 + column * 60 - surface.get_width(), y)))
+        self.display_surface.blits(blits, False)
+
+    def export_csv(self, path):
+        """
+        Write the timings of the last frames to a CSV file (one row per frame, one column per stage).
+
+        Args:
+            path (string): The path of the CSV file.
+        """
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame"] + [f"{stage}_ms" for stage in self.stages])
+            writer.writerows(self.history)
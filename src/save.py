@@ -0,0 +1,260 @@
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from storage import write_atomically
+
+
+SAVE_MAGIC = b"SLSAV"
+SAVE_VERSION = 2
+SAVE_HEADER = struct.Struct("<5sHHHI")  # Magic, version, map height and width (tiles), number of trees
+SAVE_TREE = struct.Struct("<Ib??B")  # Id, health, alive, whether the apples are kept and the apple slots (one bit per slot)
+SAVE_PLAYER = struct.Struct("<ff?")  # Player position and whether it rains
+SAVE_ITEM = struct.Struct("<I")  # Amount of an item of the inventory
+SAVE_ITEMS = ("tomato", "corn", "apple", "wood")  # Order of the items of the inventory in a save
+
+
+class Snapshot:
+    """
+    A copy of the state of a level: the soil grids, the trees, the player inventory and position, and the weather.
+    Taking one only copies a few arrays, so it can be done on the main thread without a hitch.
+    """
+    def __init__(self, grid, crops, ages, trees, inventory, position, raining):
+        """
+        Args:
+            grid (numpy.ndarray): The soil flags of each tile.
+            crops (numpy.ndarray): The crop id of each tile.
+            ages (numpy.ndarray): The crop age of each tile.
+            trees (Dict[int, Tuple[int, bool, int | None]]): The health, alive and apple slots of the trees that were
+                loaded at some point, by id (None slots grow new apples).
+            inventory (Dict[string, int]): The items of the player.
+            position (Tuple[float, float]): The position of the player.
+            raining (bool): Whether it is raining.
+        """
+        self.grid = grid
+        self.crops = crops
+        self.ages = ages
+        self.trees = trees
+        self.inventory = inventory
+        self.position = position
+        self.raining = raining
+
+    @classmethod
+    def capture(cls, level):
+        """
+        Take a snapshot of a level.
+
+        Args:
+            level (Level): The level.
+
+        Returns:
+            Snapshot: The copy of its state.
+        """
+        soil = level.soil_layer
+        return cls(grid=soil.grid.copy(),
+                   crops=soil.crops.copy(),
+                   ages=soil.ages.copy(),
+                   trees=level.tree_states(),
+                   inventory=dict(level.player.item_inventory),
+                   position=(level.player.pos.x, level.player.pos.y),
+                   raining=level.raining)
+
+    def fits(self, level):
+        """
+        Check if the snapshot was taken from a level with the same map.
+
+        Args:
+            level (Level): The level.
+
+        Returns:
+            bool: True if the grids and the trees match.
+        """
+        return self.grid.shape == level.soil_layer.grid.shape and all(tree_id < level.tree_count for tree_id in self.trees)
+
+    def restore(self, level):
+        """
+        Put the state of the snapshot back into a level (made from the same map).
+
+        Args:
+            level (Level): The level.
+        """
+        level.soil_layer.restore(self.grid, self.crops, self.ages)
+        level.restore_trees(self.trees)
+
+        player = level.player
+        player.item_inventory.update(self.inventory)
+        player.pos.update(self.position)
+        player.previous_pos.update(self.position)
+        player.rect.center = player.hitbox.center = (round(player.pos.x), round(player.pos.y))
+
+        level.raining = self.raining
+        level.soil_layer.raining = self.raining
+
+    def encode(self):
+        """
+        Serialize the snapshot. The header is followed by the compressed grids, trees, inventory and player.
+
+        Returns:
+            bytes: The binary snapshot.
+        """
+        height, width = self.grid.shape
+        body = [self.grid.astype("<u1").tobytes(),
+                self.crops.astype("<u1").tobytes(),
+                self.ages.astype("<f4").tobytes()]
+        # Stumps keep losing health when they are hit, so the health is clamped to fit in a byte
+        body.extend(SAVE_TREE.pack(tree_id, max(-128, min(127, health)), alive, slots is not None, slots or 0)
+                    for tree_id, (health, alive, slots) in sorted(self.trees.items()))
+        body.extend(SAVE_ITEM.pack(self.inventory.get(item, 0)) for item in SAVE_ITEMS)
+        body.append(SAVE_PLAYER.pack(self.position[0], self.position[1], self.raining))
+
+        header = SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, height, width, len(self.trees))
+        return header + zlib.compress(b"".join(body))
+
+    @classmethod
+    def decode(cls, data):
+        """
+        Read a binary snapshot.
+
+        Args:
+            data (bytes): The binary snapshot.
+
+        Returns:
+            Snapshot | None: The snapshot, or None if the data is not a snapshot of this version.
+        """
+        if len(data) < SAVE_HEADER.size:
+            return None
+        magic, version, height, width, tree_count = SAVE_HEADER.unpack_from(data)
+        if magic != SAVE_MAGIC or version != SAVE_VERSION:
+            return None
+        try:
+            body = zlib.decompress(data[SAVE_HEADER.size:])
+        except zlib.error:
+            return None
+
+        size = height * width
+        expected = size * 6 + SAVE_TREE.size * tree_count + SAVE_ITEM.size * len(SAVE_ITEMS) + SAVE_PLAYER.size
+        if len(body) != expected:
+            return None
+
+        grid = np.frombuffer(body, dtype="<u1", count=size).reshape(height, width).astype(np.uint8)
+        crops = np.frombuffer(body, dtype="<u1", count=size, offset=size).reshape(height, width).astype(np.uint8)
+        ages = np.frombuffer(body, dtype="<f4", count=size, offset=size * 2).reshape(height, width).astype(np.float32)
+
+        offset = size * 6
+        trees = {}
+        for i in range(tree_count):
+            tree_id, health, alive, kept, slots = SAVE_TREE.unpack_from(body, offset)
+            trees[tree_id] = (health, alive, slots if kept else None)
+            offset += SAVE_TREE.size
+
+        inventory = {}
+        for item in SAVE_ITEMS:
+            inventory[item] = SAVE_ITEM.unpack_from(body, offset)[0]
+            offset += SAVE_ITEM.size
+
+        x, y, raining = SAVE_PLAYER.unpack_from(body, offset)
+        return cls(grid, crops, ages, trees, inventory, (x, y), raining)
+
+def load_snapshot(path):
+    """
+    Load the snapshot saved in a file.
+
+    Args:
+        path (string): The path of the save file.
+
+    Returns:
+        Snapshot | None: The snapshot, or None if there is no valid save.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        return Snapshot.decode(file.read())
+
+
+def write_snapshot(path, snapshot):
+    """
+    Write a snapshot to a file. It is written to a temporary file first, so a crash (or the game closing in
+    the middle of a save) never leaves a broken save behind.
+
+    Args:
+        path (string): The path of the save file.
+        snapshot (Snapshot): The snapshot.
+    """
+    write_atomically(path, snapshot.encode())
+
+
+class SaveWriter:
+    """
+    Writes snapshots on a background thread, so encoding, compressing and writing a save never stalls a frame.
+    Only the latest snapshot waits to be written: a newer one replaces it.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (string): The path of the save file.
+        """
+        self.path = path
+        self.pending = None  # The next snapshot to be written
+        self.writing = False
+        self.error = None  # The last error of a write, if any
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.work, name="save-writer", daemon=True)
+        self.thread.start()
+
+    def save(self, snapshot):
+        """
+        Queue a snapshot to be written.
+
+        Args:
+            snapshot (Snapshot): The snapshot.
+        """
+        with self.condition:
+            self.pending = snapshot
+            self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued snapshot was written.
+
+        Args:
+            timeout (float | None): The longest time to wait, in seconds.
+
+        Returns:
+            bool: True if nothing is left to be written.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.pending is None and not self.writing, timeout)
+
+    def take_error(self):
+        """
+        Get the error of the last write that failed, if any, and forget it (so it is only reported once).
+
+        Returns:
+            OSError | None: The error.
+        """
+        with self.condition:
+            error = self.error
+            self.error = None
+            return error
+
+    def work(self):
+        """
+        Loop of the background thread.
+        """
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None)
+                snapshot = self.pending
+                self.pending = None
+                self.writing = True
+            try:
+                write_snapshot(self.path, snapshot)
+                self.error = None
+            except OSError as error:
+                self.error = error
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
@@ -0,0 +1,180 @@
+from settings import *
+
+import os
+from time import perf_counter
+
+
+def memory_usage():
+    """
+    Get the memory used by the process (resident set size). It is read from /proc, so it is only available on
+    Linux.
+
+    Returns:
+        int | None: The memory in bytes, or None if it can not be read.
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class SceneManager:
+    """
+    Builds the scenes of the game (the menu, the level) only when they are needed, a slice at a time, and
+    releases them when they are left. The next scene can be preloaded while the current one runs.
+
+    A scene is made by a builder: a generator that yields its progress (from 0 to 1) and returns the scene.
+    A scene may have an unload() method, called when it is released.
+    """
+    def __init__(self, builders):
+        """
+        Args:
+            builders (Dict[string, Callable]): The builder of each scene, by name.
+        """
+        self.builders = builders
+        self.scenes = {}  # {name: scene}, the scenes already built
+        self.building = {}  # {name: generator}, the scenes being built
+        self.progress = {}  # {name: float}
+
+        self.current = None  # Name of the scene being shown
+        self.target = None  # Name of the scene the game is switching to
+        self.switch_time = 0.0
+
+        # Report of each scene: build time, time from the switch until it was shown and peak memory
+        self.stats = {name: {"loads": 0, "build_ms": 0.0, "transition_ms": 0.0, "peak_memory_mb": None}
+                      for name in builders}
+        self.frame_count = 0
+
+    def get(self, name):
+        """
+        Get a scene, if it was built.
+
+        Args:
+            name (string): The name of the scene.
+
+        Returns:
+            object | None: The scene, or None if it is not built.
+        """
+        return self.scenes.get(name)
+
+    @property
+    def switching(self):
+        """
+        bool: True while the scene the game switched to is still being built.
+        """
+        return self.target is not None and self.target != self.current
+
+    @property
+    def loading(self):
+        """
+        bool: True while some scene is being built.
+        """
+        return bool(self.building)
+
+    def preload(self, name):
+        """
+        Start building a scene, if it is not built (or being built) yet.
+
+        Args:
+            name (string): The name of the scene.
+        """
+        if name not in self.scenes and name not in self.building:
+            self.building[name] = self.builders[name]()
+            self.progress[name] = 0.0
+            self.stats[name]["build_ms"] = 0.0
+
+    def switch(self, name):
+        """
+        Switch to a scene. The current one is shown until the new one is built, and released after that.
+
+        Args:
+            name (string): The name of the scene.
+        """
+        if name == self.target:
+            return
+        self.target = name
+        self.switch_time = perf_counter()
+        self.preload(name)
+        self.finish_switch()
+
+    def step(self, budget):
+        """
+        Go on building the scenes for a while (the scene the game is switching to goes first).
+
+        Args:
+            budget (float | None): The time to spend, in milliseconds (None builds everything).
+        """
+        end = None if budget is None else perf_counter() + budget / 1000
+        for name in sorted(self.building, key=lambda name: name != self.target):
+            builder = self.building[name]
+            start = perf_counter()
+            try:
+                while True:
+                    self.progress[name] = next(builder)
+                    if end is not None and perf_counter() >= end:
+                        return
+            except StopIteration as stop:
+                self.scenes[name] = stop.value
+                del self.building[name]
+                self.progress[name] = 1.0
+                self.stats[name]["loads"] += 1
+                self.sample_memory(name)
+            finally:
+                self.stats[name]["build_ms"] += (perf_counter() - start) * 1000
+        self.finish_switch()
+
+    def finish_switch(self):
+        """
+        Show the target scene if it is built, and release the scene that was left.
+        """
+        if not self.switching or self.target not in self.scenes:
+            return
+        previous = self.current
+        self.current = self.target
+        self.stats[self.current]["transition_ms"] = (perf_counter() - self.switch_time) * 1000
+        if previous is not None:
+            self.unload(previous)
+
+    def unload(self, name):
+        """
+        Release a scene: its sprites and surfaces are dropped (it is built again if it is needed later).
+
+        Args:
+            name (string): The name of the scene.
+        """
+        scene = self.scenes.pop(name, None)
+        self.building.pop(name, None)
+        self.progress.pop(name, None)
+        if scene is not None and hasattr(scene, "unload"):
+            scene.unload()
+
+    def update(self):
+        """
+        Called once per frame: keeps track of the peak memory of the current scene every few frames.
+        """
+        self.frame_count += 1
+        if self.current is not None and self.frame_count % SCENE_MEMORY_SAMPLE == 0:
+            self.sample_memory(self.current)
+
+    def sample_memory(self, name):
+        """
+        Update the peak memory of a scene with the memory used right now.
+
+        Args:
+            name (string): The name of the scene.
+        """
+        memory = memory_usage()
+        if memory is None:
+            return
+        stats = self.stats[name]
+        stats["peak_memory_mb"] = max(stats["peak_memory_mb"] or 0.0, memory / 2 ** 20)
+
+    def report(self):
+        """
+        Get the report of every scene.
+
+        Returns:
+            Dict[string, dict]: The loads, build time, transition time (ms) and peak memory (MB) of each scene.
+        """
+        return {name: dict(stats) for name, stats in self.stats.items()}
@@ -4,9 +4,14 @@ SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 TILE_SIZE = 16
 
-# Map dimensions in tiles
-MAP_WIDTH = 80
-MAP_HEIGHT = 60
+# Size (in tiles) of the chunks where the static layers are baked, also the regions of the map that are
+# streamed in and out around the player
+CHUNK_SIZE = 16
+STREAM_RADIUS = 2  # Regions loaded around the region of the player (on each axis)
+STREAM_LOADS_PER_STEP = 1  # Regions loaded on each simulation step at most (a fixed count keeps runs repeatable)
+
+# Size (in pixels) of the cells used to find the sprites near an area
+SPATIAL_HASH_CELL = 64
 
 # Overlay offsets
 PLAYER_TOOL_OFFSET = {
@@ -19,7 +24,9 @@ PLAYER_TOOL_OFFSET = {
 OVERLAY_POS = {
     'tools' : (40, SCREEN_HEIGHT - 5),
     'seeds' : (90, SCREEN_HEIGHT - 15),
+    'message' : (SCREEN_WIDTH // 2, 30),
 }
+OVERLAY_MESSAGE_TIME = 4000  # Time a message stays on the screen (ms)
 
 # Drawing layers
 LAYERS = {
@@ -43,7 +50,46 @@ APPLE_POS = {
     'Tree Large' : [(6, -5), (11, 1), (6, 5), (6, -5), (11, 1), (6, 5)]
 }
 
+# Age of a fully grown crop (last growth stage)
+PLANT_MAX_AGE = 3
+
 GROWTH_SPEED = {
     'corn' : 1,
     'tomato' : 0.7,
 }
+
+# Game loop: the simulation runs at a fixed step, the drawing at up to FPS_CAP frames per second
+SIMULATION_STEP = 1 / 60  # Fixed time step of the simulation (seconds), also used by headless runs
+FPS_CAP = 144  # 0 draws as fast as possible (for benchmarks)
+MAX_FRAME_TIME = 0.25  # Longest frame simulated (seconds), so a stall does not cause a burst of steps
+
+# Frame profiler (F3 shows it, F4 exports its timings)
+PROFILER_WINDOW = 120  # Frames used for the rolling mean and p99
+PROFILER_HISTORY = 3600  # Frames kept for the CSV export
+PROFILER_REFRESH = 15  # Frames between updates of the text
+PROFILER_CSV = "profiler.csv"
+
+# Rain particles
+RAIN_CAPACITY = 256  # Size of the particle pool
+RAIN_DROPS_PER_SECOND = 60  # Falling drops spawned inside the camera view
+RAIN_PUDDLES_PER_SECOND = 40  # Puddles spawned inside the camera view
+RAIN_LIFETIME = (400, 500)  # Range of the lifetime of a particle (ms)
+RAIN_DIRECTION = (-2, 4)  # Direction of the falling drops (scaled by a speed from 50 to 100)
+RAIN_MARGIN = 60  # Extra area above and to the right of the view where the drops can spawn
+
+# Screen tint (day/night cycle and sleep transition)
+TINT_QUANTUM = 4  # Step of the tint colors (bigger steps reuse the cached surfaces for longer)
+TINT_CACHE_SIZE = 4  # Tint surfaces kept in memory (each one is the size of the screen)
+
+# Save file (written in the background every time the player sleeps)
+SAVE_FILE = "save.dat"
+
+# Menu background (its animation frames are rendered once and kept on disk)
+MENU_BACKGROUND_FILE = "data/menu.cache"
+
+# Loading (the files are read by worker threads, the sprites are created a slice at a time on the main thread)
+LOADER_WORKERS = 2  # Worker threads that decode the images and read the map
+LOAD_BUDGET = 8  # Time spent building the level on each frame (ms)
+
+# Scenes (built when needed, released when left)
+SCENE_MEMORY_SAMPLE = 60  # Frames between two samples of the memory used by the current scene
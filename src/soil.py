@@ -1,26 +1,105 @@
 import pygame
 from settings import *
+import assets
 
-from pytmx.util_pygame import load_pygame
 
+import numpy as np
 
-class SoilTile(pygame.sprite.Sprite):
+
+# Soil flags (bits of each cell of the grid) ------------------------------------------------------------
+FARMABLE = 1
+SOIL = 2
+WATERED = 4
+PLANTED = 8
+
+# Crop ids used in the crops grid (0 means no crop)
+CROPS = list(GROWTH_SPEED.keys())
+
+
+class FarmLayer(pygame.sprite.Sprite):
     """
-    A class for farm tiles.
+    A single sprite with the tilled and watered soil of a region of the map. Its surface is kept between frames
+    and only the tiles marked as dirty are drawn again. It is only updated while it has dirty tiles.
     """
-    def __init__(self, pos, surf, groups, z = LAYERS["soil"]):
+    def __init__(self, soil, bounds, groups):
+        """
+        Args:
+            soil (Soil): The soil of the farm.
+            bounds (Tuple[int, int, int, int]): The tiles covered by the layer (left, top, right, bottom), the
+                right and bottom ones excluded.
+            groups (List[pygame.sprite.Group]): The groups of the sprite.
+        """
         super().__init__(groups)
-        self.image = surf
-        self.rect = self.image.get_rect(topleft = pos)
-        self.z = z
+        self.soil = soil
+        self.z = LAYERS["soil"]
+        self.bounds = bounds
+        left, top, right, bottom = bounds
+        
+        self.image = pygame.Surface(((right - left) * TILE_SIZE, (bottom - top) * TILE_SIZE), pygame.SRCALPHA).convert_alpha()
+        self.image.fill((0, 0, 0, 0))
+        self.rect = self.image.get_rect(topleft=(left * TILE_SIZE, top * TILE_SIZE))
+        
+        self.empty_tile = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+        self.empty_tile.fill((0, 0, 0, 0))
+        
+        # Tiles that changed since the last frame
+        self.dirty = np.zeros((bottom - top, right - left), dtype=bool)
+        self.has_dirty = False
+        
+    def mark(self, tiles):
+        """
+        Mark tiles to be drawn again on the next update.
+
+        Args:
+            tiles (Tuple[int, int] | numpy.ndarray): The (y, x) index of a tile, or a mask of tiles of the whole map.
+        """
+        left, top, right, bottom = self.bounds
+        if isinstance(tiles, tuple):
+            self.dirty[tiles[0] - top, tiles[1] - left] = True
+        else:
+            self.dirty |= tiles[top:bottom, left:right]
+        self.has_dirty = True
+        self.soil.update_sprites.add(self)
+        
+    def mark_all(self):
+        """
+        Mark every tile of the layer to be drawn again on the next update.
+        """
+        self.dirty[:] = True
+        self.has_dirty = True
+        self.soil.update_sprites.add(self)
+        
+    def update(self, dt):
+        """
+        Draw again the tiles that changed since the last frame.
+
+        Args:
+            dt (int): The time in milliseconds since the last frame.
+        """
+        if not self.has_dirty:
+            return
+        
+        left, top, right, bottom = self.bounds
+        cells = np.argwhere(self.dirty)
+        flags = self.soil.grid[top:bottom, left:right][self.dirty]
+        self.dirty[:] = False
+        self.has_dirty = False
+        self.soil.update_sprites.remove(self)
+        
+        positions = [(x * TILE_SIZE, y * TILE_SIZE) for y, x in cells.tolist()]
+        self.image.blits([(self.empty_tile, pos, None, pygame.BLEND_RGBA_MIN) for pos in positions], False)
+        self.image.blits([(self.soil.soil_surface, pos) for pos, flag in zip(positions, flags) if flag & SOIL], False)
+        self.image.blits([(self.soil.soil_water, pos) for pos, flag in zip(positions, flags) if flag & WATERED], False)
 
 class Plant(pygame.sprite.Sprite):
-    def __init__(self, type, groups, soil, tile_watered):
+    """
+    A class for crops. The age of the crop is kept in the soil grid, the sprite only shows it.
+    """
+    def __init__(self, type, groups, tile_rect):
         super().__init__(groups)
         self.type = type
         self.z = LAYERS["ground_plants"]
-        self.tile_watered = tile_watered
-        self.soil = soil
+        self.tile_rect = tile_rect  # The soil tile where it was planted
         
         # Assets ----------------------------------------------------------------------------------------
         self.frames = []
@@ -28,7 +107,7 @@ class Plant(pygame.sprite.Sprite):
         
         # Growth attributes -----------------------------------------------------------------------------
         self.age = 0
-        self.max_age = 3
+        self.max_age = PLANT_MAX_AGE
         self.growth_speed = GROWTH_SPEED[self.type]
         self.grown = False
         
@@ -36,60 +115,61 @@ class Plant(pygame.sprite.Sprite):
         self.image = self.frames[self.age]
         self.height_offset = -2 if self.type == "corn" else -4
         # self.height_offset = 0
-        self.rect = self.image.get_rect(midbottom = (self.soil.rect.midbottom + pygame.math.Vector2(0, self.height_offset)))
+        self.rect = self.image.get_rect(midbottom = (self.tile_rect.midbottom + pygame.math.Vector2(0, self.height_offset)))
         
     def import_assets(self):
         """
-        Import the assets of the plant.
+        Import the assets of the plant (its growth stages).
         """
-        basic_pants = pygame.image.load("assets/Objects/Basic Plants.png").convert_alpha()
-        frame_width = basic_pants.get_width() // 6
-        frame_height = basic_pants.get_height() // 2
-        
-        for col in range(6):
-            for row in range(2):
-                frame = basic_pants.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                if self.type == "corn":
-                    if row == 0 and col >= 1 and col <= 4:
-                        self.frames.append(frame)
-                elif self.type == "tomato":
-                    if row == 1 and col >= 1 and col <= 4:
-                        self.frames.append(frame)
+        self.frames = assets.frames(self.type)
 
-    def grow(self):
+    def grow(self, age):
         """
-        Grow the plant.
+        Grow the plant to the given age.
+
+        Args:
+            age (float): The new age of the plant (already limited to max_age by the soil).
         """
-        if self.tile_watered(self.rect.center):
-            self.age += self.growth_speed
+        self.age = age
+        
+        if int(self.age) > 0:
+            self.z = LAYERS["main"]
+            #self.hitbox = self.rect.copy().inflate(-4, -4)
             
-            if int(self.age) > 0:
-                self.z = LAYERS["main"]
-                #self.hitbox = self.rect.copy().inflate(-4, -4)
-                
-            if self.age >= self.max_age:
-                self.age == self.max_age
-                self.grown = True
-          
-            self.image = self.frames[int(self.age)]
-            self.rect = self.image.get_rect(midbottom = (self.soil.rect.midbottom + pygame.math.Vector2(0, self.height_offset)))
+        if self.age >= self.max_age:
+            self.grown = True
+      
+        self.image = self.frames[int(self.age)]
+        self.rect = self.image.get_rect(midbottom = (self.tile_rect.midbottom + pygame.math.Vector2(0, self.height_offset)))
+        for group in self.groups():
+            if hasattr(group, 'refresh'):  # The camera has to know where the new rect is
+                group.refresh(self)
         
 
 class Soil:
     """
     A class for the soil in the farm.
     """
-    def __init__(self, all_sprites):
+    def __init__(self, all_sprites, update_sprites, tile_map):
+        """
+        Args:
+            all_sprites (CameraGroup): The group of every sprite of the level.
+            update_sprites (pygame.sprite.Group): The group of the sprites updated every frame.
+            tile_map (TileMap): The map of the level.
+        """
         self.all_sprites = all_sprites
-        self.soil_sprites = pygame.sprite.Group()
-        self.soil_water_sprites = pygame.sprite.Group()
+        self.update_sprites = update_sprites  # The farm layers join it when some tiles have to be drawn again
         self.plant_sprites = pygame.sprite.Group()
         
         self.soil_surface = None
         self.soil_water = None
         self.import_assets()
-        self.create_scenario_grid()
-        self.create_hittable_soil()
+        self.create_scenario_grid(tile_map)
+        
+        # The grids cover the whole map, but the sprites only exist in the regions loaded around the player.
+        # The tilled and watered tiles of each region are drawn on a single sprite.
+        self.regions = set()
+        self.farm_layers = {}  # {(region_x, region_y): FarmLayer}
         
         self.raining = False
          
@@ -97,46 +177,105 @@ class Soil:
         """
         Importing the assets for the soil sprite sheet.
         """
-        soil_tiles = pygame.image.load("assets/Tilesets/Tilled Dirt.png").convert_alpha()
-        frame_width = soil_tiles.get_width() // 8
-        frame_height = soil_tiles.get_height() // 8
-        
-        for col in range(8):
-            for row in range(8):
-                frame = soil_tiles.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                if col == 2 and row == 4:
-                    self.soil_surface = frame
-                if col == 1 and row == 0:
-                    self.soil_water = frame
+        self.soil_surface = assets.frame("soil")
+        self.soil_water = assets.frame("soil_water")
                     
-    def create_scenario_grid(self):
+    def create_scenario_grid(self, tile_map):
+        """
+        Create a grid with the scenario tiles, as big as the map. This grid will be used to manage the farm soil
+        tiles. Each cell of the grid holds the soil flags of the tile, and two parallel grids hold the crop
+        planted on it and its age.
+
+        Args:
+            tile_map (TileMap): The map of the level.
+        """
+        farm_gids = np.frombuffer(tile_map.get_layer_by_name("Farm Layer").gids, dtype=np.uint16)
+        self.grid = np.where(farm_gids.reshape(tile_map.height, tile_map.width) != 0, FARMABLE, 0).astype(np.uint8)
+        
+        self.crops = np.zeros(self.grid.shape, dtype=np.uint8)
+        self.ages = np.zeros(self.grid.shape, dtype=np.float32)
+        self.growth_speeds = np.array([0] + [GROWTH_SPEED[crop] for crop in CROPS], dtype=np.float32)
+        self.plants = {}  # {(x, y): Plant}
+        self.grown_plants = {}  # {(x, y): Plant}, the crops that can be harvested
+        self.harvest_area = None  # Tiles under the player on the last harvest check
+        
+    def region_bounds(self, region):
+        """
+        Get the tiles of a region of the map.
+
+        Args:
+            region (Tuple[int, int]): The x and y of the region.
+
+        Returns:
+            Tuple[int, int, int, int]: The left, top, right and bottom tiles (the right and bottom ones excluded).
+        """
+        left, top = region[0] * CHUNK_SIZE, region[1] * CHUNK_SIZE
+        return left, top, min(left + CHUNK_SIZE, self.grid.shape[1]), min(top + CHUNK_SIZE, self.grid.shape[0])
+    
+    def load_region(self, region):
+        """
+        Create the farm layer and the crops of a region that came near the player.
+
+        Args:
+            region (Tuple[int, int]): The x and y of the region.
+        """
+        self.regions.add(region)
+        left, top, right, bottom = bounds = self.region_bounds(region)
+        if self.grid[top:bottom, left:right].any():
+            layer = FarmLayer(self, bounds, self.all_sprites)
+            layer.mark_all()
+            self.farm_layers[region] = layer
+        
+        for y, x in np.argwhere(self.grid[top:bottom, left:right] & PLANTED).tolist():
+            self.show_plant(left + x, top + y)
+            
+    def unload_region(self, region):
         """
-        Create a grid with the scenario tiles. This grid will be used to manage the farm soil tiles.
+        Remove the farm layer and the crops of a region that was left behind. Their state stays in the grids.
+
+        Args:
+            region (Tuple[int, int]): The x and y of the region.
         """
-        self.grid = [[[] for col in range(MAP_WIDTH)] for row in range(MAP_HEIGHT)]
-        for x, y, surface in load_pygame("data/tmx/map.tmx").get_layer_by_name("Farm Layer").tiles():
-            self.grid[y][x].append("Farmable")
+        self.regions.discard(region)
+        layer = self.farm_layers.pop(region, None)
+        if layer is not None:
+            layer.kill()
         
-    def create_hittable_soil(self):
+        left, top, right, bottom = self.region_bounds(region)
+        for (x, y) in [tile for tile in self.plants if left <= tile[0] < right and top <= tile[1] < bottom]:
+            self.plants.pop((x, y)).kill()
+            self.grown_plants.pop((x, y), None)
+            
+    def mark(self, tiles):
         """
-        Create a list of Tiles that can be hit by the player's hoe to create farm tiles.
+        Mark tiles to be drawn again by the farm layers of the loaded regions.
+
+        Args:
+            tiles (Tuple[int, int] | numpy.ndarray): The (y, x) index of a tile, or a mask of tiles of the whole map.
         """
-        self.hittable_soil = []
-        for y, row in enumerate(self.grid):
-            for x, tile in enumerate(row):
-                if "Farmable" in tile:
-                    rect = pygame.Rect((x * TILE_SIZE), (y * TILE_SIZE), TILE_SIZE, TILE_SIZE)
-                    self.hittable_soil.append(rect)
+        if isinstance(tiles, tuple):
+            layer = self.farm_layers.get((tiles[1] // CHUNK_SIZE, tiles[0] // CHUNK_SIZE))
+            if layer is not None:
+                layer.mark(tiles)
+        else:
+            for layer in self.farm_layers.values():
+                layer.mark(tiles)
                 
-    def create_soil_tiles(self):
+    def tile(self, point):
         """
-        Create the soil tiles based on the scenario grid.
+        Get the tile of the grid that contains a point.
+
+        Args:
+            point (Tuple[int, int]): The point in the world.
+
+        Returns:
+            Tuple[int, int] | None: The x and y of the tile, or None if the point is outside the map.
         """
-        self.soil_sprites.empty()
-        for y, row in enumerate(self.grid):
-            for x, tile in enumerate(row):
-                if "Soil" in tile:
-                    SoilTile(((x * TILE_SIZE), (y * TILE_SIZE)), self.soil_surface, [self.all_sprites, self.soil_sprites])
+        x = int(point[0] // TILE_SIZE)
+        y = int(point[1] // TILE_SIZE)
+        if 0 <= x < self.grid.shape[1] and 0 <= y < self.grid.shape[0]:
+            return x, y
+        return None
     
     def hit(self, point):
         """
@@ -145,15 +284,14 @@ class Soil:
         Args:
             point (Tuple[int, int]): The point where the player hit the soil.
         """
-        for tile in self.hittable_soil:
-            y = tile.y // TILE_SIZE
-            x = tile.x // TILE_SIZE
-            if tile.collidepoint(point) and "Farmable" in self.grid[y][x]:
-                self.grid[y][x].append("Soil")
-                self.create_soil_tiles()
-                
-                if self.raining:
-                    self.water_all()
+        tile = self.tile(point)
+        if tile is not None:
+            x, y = tile
+            if self.grid[y, x] & FARMABLE:
+                self.grid[y, x] |= SOIL
+                if self.raining:  # The rest of the soil was watered when the rain started
+                    self.grid[y, x] |= WATERED
+                self.mark((y, x))
                 
     def water(self, point):
         """
@@ -162,37 +300,36 @@ class Soil:
         Args:
             point (Tuple[int, int]): The point where the player watered the soil.
         """
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(point):
-                x = soil_sprite.rect.x // TILE_SIZE
-                y = soil_sprite.rect.y // TILE_SIZE
-                self.grid[y][x].append("Watered")
-                
-                SoilTile(soil_sprite.rect.topleft, self.soil_water, [self.all_sprites, self.soil_water_sprites], LAYERS["soil_water"])
+        tile = self.tile(point)
+        if tile is not None:
+            x, y = tile
+            if (self.grid[y, x] & (SOIL | WATERED)) == SOIL:  # Tiles that are already wet are left alone
+                self.grid[y, x] |= WATERED
+                self.mark((y, x))
      
     def water_all(self):
         """
         Water all the soil tiles. It happens when it's raining.
         """
-        for y, row in enumerate(self.grid):
-            for x, tile in enumerate(row):
-                if "Soil" in tile and "Watered" not in tile:
-                    self.grid[y][x].append("Watered")
-                    SoilTile(((x*TILE_SIZE),(y*TILE_SIZE)), self.soil_water, [self.all_sprites, self.soil_water_sprites], LAYERS["soil_water"])
+        dry = (self.grid & (SOIL | WATERED)) == SOIL
+        self.grid[dry] |= WATERED
+        self.mark(dry)
                     
     def remove_water(self):
         """
         Remove the water from the soil tiles. Simulates the water evaporating over time.
         """
-        for sprite in self.soil_water_sprites.sprites():
-            sprite.kill()
-            
-        for y, row in enumerate(self.grid):
-            for x, tile in enumerate(row):
-                if "Watered" in tile:
-                    self.grid[y][x].remove("Watered")
-                    
-        self.create_soil_tiles()
+        self.mark((self.grid & WATERED).astype(bool))
+        self.grid &= ~np.uint8(WATERED)
+             
+    def farm_tile_count(self):
+        """
+        Count the tiles of the farm that were tilled.
+
+        Returns:
+            int: The number of soil tiles.
+        """
+        return int(np.count_nonzero(self.grid & SOIL))
              
     def tile_watered(self, pos):
         """
@@ -206,17 +343,126 @@ class Soil:
         """
         x = pos[0] // TILE_SIZE
         y = pos[1] // TILE_SIZE
-        return "Watered" in self.grid[y][x]         
+        return bool(self.grid[y, x] & WATERED)
        
     def update_plants(self):
-        for plants in self.plant_sprites.sprites():
-            plants.grow()
+        """
+        Grow every crop planted on a watered tile, according to the growth speed of the crop.
+        """
+        growing = (self.grid & (PLANTED | WATERED)) == (PLANTED | WATERED)
+        self.ages[growing] = np.minimum(self.ages[growing] + self.growth_speeds[self.crops[growing]], PLANT_MAX_AGE)
+        
+        # Only the sprites of the crops that grew have to change (the others only have their age in the grid)
+        for (x, y), plant in self.plants.items():
+            if not growing[y, x]:
+                continue
+            plant.grow(float(self.ages[y, x]))
+            if plant.grown:
+                self.grown_plants[(x, y)] = plant
+                self.harvest_area = None  # A crop might have grown under the player
        
     def plant(self, point, seed):
-        for soil_sprite in self.soil_sprites.sprites():
-            if soil_sprite.rect.collidepoint(point):
-                x = soil_sprite.rect.x // TILE_SIZE
-                y = soil_sprite.rect.y // TILE_SIZE
-                if "Planted" not in self.grid[y][x]:
-                    self.grid[y][x].append("Planted")
-                    Plant(seed, [self.all_sprites, self.plant_sprites], soil_sprite, self.tile_watered)
\ No newline at end of file
+        """
+        Plant a seed in the soil.
+
+        Args:
+            point (Tuple[int, int]): The point where the player planted the seed.
+            seed (string): The type of the crop.
+        """
+        tile = self.tile(point)
+        if tile is not None:
+            x, y = tile
+            if (self.grid[y, x] & (SOIL | PLANTED)) == SOIL:
+                self.grid[y, x] |= PLANTED
+                self.crops[y, x] = CROPS.index(seed) + 1
+                self.ages[y, x] = 0
+                self.show_plant(x, y)
+                
+    def show_plant(self, x, y):
+        """
+        Create the sprite of the crop planted on a tile, at its current age. Crops of the regions that are not
+        loaded have no sprite.
+
+        Args:
+            x (int): The x of the tile.
+            y (int): The y of the tile.
+        """
+        if (x // CHUNK_SIZE, y // CHUNK_SIZE) not in self.regions:
+            return
+        tile_rect = pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        plant = Plant(CROPS[self.crops[y, x] - 1], [self.all_sprites, self.plant_sprites], tile_rect)
+        plant.grow(float(self.ages[y, x]))
+        self.plants[(x, y)] = plant
+        if plant.grown:
+            self.grown_plants[(x, y)] = plant
+            self.harvest_area = None
+                    
+    def remove_plant(self, pos):
+        """
+        Remove the crop of a tile from the grid (after it was harvested).
+
+        Args:
+            pos (Tuple[int, int]): A position inside the tile.
+        """
+        x = pos[0] // TILE_SIZE
+        y = pos[1] // TILE_SIZE
+        self.grid[y, x] &= ~np.uint8(PLANTED)
+        self.crops[y, x] = 0
+        self.ages[y, x] = 0
+        self.plants.pop((x, y), None)
+        self.grown_plants.pop((x, y), None)
+        
+    def restore(self, grid, crops, ages):
+        """
+        Replace the farm by a saved one, creating again the sprites of its crops.
+
+        Args:
+            grid (numpy.ndarray): The soil flags of each tile.
+            crops (numpy.ndarray): The crop id of each tile.
+            ages (numpy.ndarray): The crop age of each tile.
+        """
+        for plant in self.plants.values():
+            plant.kill()
+        self.plants = {}
+        self.grown_plants = {}
+        self.harvest_area = None
+        
+        self.grid[:] = grid
+        self.crops[:] = crops
+        self.ages[:] = ages
+        
+        for region in sorted(self.regions):  # Only the crops of the loaded regions have sprites
+            left, top, right, bottom = self.region_bounds(region)
+            for y, x in np.argwhere(self.grid[top:bottom, left:right] & PLANTED).tolist():
+                self.show_plant(left + x, top + y)
+        
+        for layer in self.farm_layers.values():
+            layer.mark_all()
+        
+    def harvest(self, hitbox):
+        """
+        Harvest the grown crops on the tiles under a hitbox. The tiles are only checked when the hitbox enters a
+        new set of tiles (or a crop grows), so standing still or walking over empty ground costs nothing.
+
+        Args:
+            hitbox (pygame.Rect): The hitbox of the player.
+
+        Returns:
+            List[Plant]: The crops that were harvested (already removed from the grid).
+        """
+        area = (hitbox.left // TILE_SIZE, hitbox.top // TILE_SIZE,
+                (hitbox.right - 1) // TILE_SIZE, (hitbox.bottom - 1) // TILE_SIZE)
+        if area == self.harvest_area or not self.grown_plants:
+            self.harvest_area = area
+            return []
+        self.harvest_area = area
+        
+        left, top, right, bottom = area
+        harvested = []
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                plant = self.grown_plants.get((x, y))
+                if plant is not None:
+                    harvested.append(plant)
+                    self.remove_plant(plant.tile_rect.topleft)
+        return harvested
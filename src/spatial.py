@@ -0,0 +1,169 @@
+import pygame
+from settings import *
+
+
+class SpatialHash:
+    """
+    Uniform grid that indexes sprites by the cells their rect overlaps. It answers "which sprites are near this
+    area" by looking at a few cells instead of going through every sprite.
+    """
+    def __init__(self, cell_size=SPATIAL_HASH_CELL, rect_attr="rect"):
+        self.cell_size = cell_size
+        self.rect_attr = rect_attr  # Name of the rect attribute used to index the sprites
+        self.cells = {}  # {(cell_x, cell_y): set of sprites}
+        self.ranges = {}  # {sprite: (left, top, right, bottom) range of cells where it is}
+
+    def cell_range(self, rect):
+        """
+        Get the range of cells overlapped by a rect.
+
+        Args:
+            rect (pygame.Rect): The rect in world coordinates.
+
+        Returns:
+            Tuple[int, int, int, int]: The first and last cells overlapped on each axis (left, top, right, bottom).
+        """
+        return (rect.left // self.cell_size,
+                rect.top // self.cell_size,
+                (rect.right - 1) // self.cell_size,
+                (rect.bottom - 1) // self.cell_size)
+
+    def insert(self, sprite):
+        """
+        Insert a sprite in all the cells overlapped by its rect.
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to be inserted.
+        """
+        cell_range = self.cell_range(getattr(sprite, self.rect_attr))
+        self.ranges[sprite] = cell_range
+
+        left, top, right, bottom = cell_range
+        for cell_y in range(top, bottom + 1):
+            for cell_x in range(left, right + 1):
+                self.cells.setdefault((cell_x, cell_y), set()).add(sprite)
+
+    def remove(self, sprite):
+        """
+        Remove a sprite from the cells where it was inserted.
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to be removed.
+        """
+        cell_range = self.ranges.pop(sprite, None)
+        if cell_range is None:
+            return
+
+        left, top, right, bottom = cell_range
+        for cell_y in range(top, bottom + 1):
+            for cell_x in range(left, right + 1):
+                cell = self.cells[(cell_x, cell_y)]
+                cell.discard(sprite)
+                if not cell:
+                    del self.cells[(cell_x, cell_y)]
+
+    def move(self, sprite):
+        """
+        Update the cells of a sprite after its rect changed. Nothing is done if it is still in the same cells.
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite that moved.
+        """
+        if self.ranges.get(sprite) != self.cell_range(getattr(sprite, self.rect_attr)):
+            self.remove(sprite)
+            self.insert(sprite)
+
+    def query(self, rect):
+        """
+        Get the sprites in the cells overlapped by a rect. Sprites close to the rect may be included too.
+
+        Args:
+            rect (pygame.Rect): The area to look for sprites.
+
+        Returns:
+            Set[pygame.sprite.Sprite]: The sprites found.
+        """
+        found = set()
+        left, top, right, bottom = self.cell_range(rect)
+        for cell_y in range(top, bottom + 1):
+            for cell_x in range(left, right + 1):
+                cell = self.cells.get((cell_x, cell_y))
+                if cell:
+                    found |= cell
+        return found
+
+class CollisionGroup(pygame.sprite.Group):
+    """
+    A sprite group for obstacles, indexed by hitbox in a uniform grid. Collision checks only look at the
+    obstacles in the cells overlapped by a rect, so their cost does not grow with the size of the map.
+    """
+    def __init__(self, cell_size=TILE_SIZE * 2, rect_attr="hitbox"):
+        super().__init__()
+        self.rect_attr = rect_attr
+        self.grid = SpatialHash(cell_size, rect_attr=rect_attr)
+        self.pending = []  # Sprites added since the last query (their hitbox might not be set yet)
+        self.order = {}  # Insertion order, so obstacles are always resolved in the same order
+        self.count = 0
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.pending.append(sprite)
+        self.order[sprite] = self.count
+        self.count += 1
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.order.pop(sprite, None)
+        self.grid.remove(sprite)
+
+    def refresh(self, sprite):
+        """
+        Update the cells of an obstacle after its hitbox changed.
+
+        Args:
+            sprite (pygame.sprite.Sprite): The obstacle whose hitbox changed.
+        """
+        if sprite in self.order:
+            self.grid.move(sprite)
+
+    def index_pending(self):
+        """
+        Insert in the grid the sprites added since the last query.
+        """
+        for sprite in self.pending:
+            if sprite in self.order:
+                self.grid.move(sprite)
+        self.pending.clear()
+
+    def nearby(self, rect):
+        """
+        Get the obstacles whose hitbox collides with a rect.
+
+        Args:
+            rect (pygame.Rect): The rect to be checked (usually a hitbox).
+
+        Returns:
+            List[pygame.sprite.Sprite]: The colliding obstacles, in the order they were added to the group.
+        """
+        self.index_pending()
+        colliding = [sprite for sprite in self.grid.query(rect)
+                     if rect.colliderect(getattr(sprite, self.rect_attr))]
+        colliding.sort(key=self.order.get)
+        return colliding
+
+    def at(self, point):
+        """
+        Get the sprites that contain a point. Only the cell of the point is looked at.
+
+        Args:
+            point (Tuple[int, int]): The point in the world.
+
+        Returns:
+            List[pygame.sprite.Sprite]: The sprites found, in the order they were added to the group.
+        """
+        self.index_pending()
+        cell = (int(point[0] // self.grid.cell_size), int(point[1] // self.grid.cell_size))
+        found = [sprite for sprite in self.grid.cells.get(cell, ())
+                 if getattr(sprite, self.rect_attr).collidepoint(point)]
+        found.sort(key=self.order.get)
+        return found
@@ -1,6 +1,7 @@
 import pygame
 from settings import *
-from timer import Timer
+from timer import Timer, scheduler
+import assets
 
 from random import randint, choice
 
@@ -16,26 +17,6 @@ class Tile(pygame.sprite.Sprite):
         self.hitbox = self.rect.inflate(-self.rect.width * 0.3, -self.rect.height * 0.85)
         self.z = z
         
-class Water(Tile):
-    """
-    A class for water tiles.
-    """
-    def __init__(self, pos, frames, groups):
-        self.frames = frames
-        self.frame_index = 0
-        
-        super().__init__(pos, self.frames[self.frame_index], groups, z=LAYERS["water"])
-        
-    def update(self, dt):
-        """
-        Update the water animation.
-
-        Args:
-            dt (int): The time in milliseconds since the last frame.
-        """
-        self.frame_index += 2 * dt 
-        self.image = self.frames[int(self.frame_index) % len(self.frames)]
-        
 class WildFlower(Tile):
     """
     A class for small plants and nature structures.
@@ -50,24 +31,13 @@ class Particle(Tile):
     """
     def __init__(self, pos, surf, groups, z, duration=200):
         super().__init__(pos, surf, groups, z)
-        self.time0 = pygame.time.get_ticks()
         self.duration = duration
+        scheduler.schedule(self.duration, self.kill)  # Removed by the scheduler when its time is over
         
         mask_surface = pygame.mask.from_surface(self.image)
         new_surface = mask_surface.to_surface(setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 0))
         self.image = new_surface
         
-    def update(self, dt):
-        """
-        Update the particle sprite.
-
-        Args:
-            dt (int): The time in milliseconds since the last frame.
-        """
-        time = pygame.time.get_ticks()  # Get the current time in milliseconds
-        if time - self.time0 > self.duration:
-            self.kill()
-        
 class Tree(Tile):
     """
     A class for trees. Trees are the main source of wood and fruits in the game.
@@ -100,41 +70,42 @@ class Tree(Tile):
         
     def import_assets(self):
         """
-        Import the assets for the tree from the spritesheet.
+        Import the assets for the tree (they are shared by all trees).
         """
-        grass_biom_sprites = pygame.image.load("assets/Objects/Basic Grass Biom things 1.png").convert_alpha()
-        frame_width = grass_biom_sprites.get_width() // 9
-        frame_height = grass_biom_sprites.get_height() // 5
-        
-        for col in range(9):
-            for row in range(5):
-                frame = grass_biom_sprites.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
-                if col == 0 and row == 2:
-                    self.apple_surface = frame
-                
-                if self.name == "Tree":
-                    if col == 3 and row == 2:
-                        self.stump_surface = frame
-                
-                if self.name == "Tree Large":
-                    if col == 4 and row == 2:
-                        self.stump_surface = frame
+        self.apple_surface = assets.frame("apple")
+        self.stump_surface = assets.frame(self.name.lower().replace(" ", "_") + "_stump")
                     
-    def create_fruit(self):
+    def create_fruit(self, slots=None):
         """
         Create the apples in the tree. For each position in the apple_pos list, there is a 30% chance of creating an apple.
+
+        Args:
+            slots (int | None): The positions with an apple (one bit per position), instead of random ones.
         """
-        for pos in self.apple_pos:
-            if randint(0, 10) < 3:
+        for slot, pos in enumerate(self.apple_pos):
+            if (randint(0, 10) < 3) if slots is None else (slots >> slot) & 1:
                 x = self.rect.left + pos[0]
                 y = self.rect.top + pos[1]
                 
                 # Apples do not need an specific class
-                Tile(pos=(x, y), 
-                     surf=self.apple_surface, 
-                     groups=[self.apple_sprites, self.groups[0]], 
-                     z=LAYERS["fruits"])
+                apple = Tile(pos=(x, y), 
+                             surf=self.apple_surface, 
+                             groups=[self.apple_sprites, self.groups[0]], 
+                             z=LAYERS["fruits"])
+                apple.slot = slot
                 
+    def apple_slots(self):
+        """
+        Get the positions of the apple_pos list that have an apple.
+
+        Returns:
+            int: One bit per position.
+        """
+        slots = 0
+        for apple in self.apple_sprites:
+            slots |= 1 << apple.slot
+        return slots
+        
     def damage(self):
         """
         Damage the tree. If the tree has no more health, it dies. Each hit drops an apple (if there are apples).
@@ -151,6 +122,10 @@ class Tree(Tile):
                      groups=[self.groups[0]], 
                      z=LAYERS["fruits"])
             self.update_inventory('apple')
+        
+        # Trees are not updated every frame, so the death is checked only when they are hit
+        if self.alive:
+            self.death()
             
     def death(self):
         """
@@ -162,25 +137,41 @@ class Tree(Tile):
                      groups=[self.groups[0]], 
                      z=LAYERS["fruits"])
             
-            # Create a stump
-            self.image = self.stump_surface
-            self.rect = self.image.get_rect(midbottom = self.rect.midbottom)
-            self.hitbox = self.rect.inflate(-10, -self.rect.height * 0.6)
-            self.alive = False
+            self.become_stump()
             
             # Drop wood
             self.update_inventory('wood')
-        
-    def update(self, dt):
+            
+    def become_stump(self):
+        """
+        Replace the tree by its stump.
         """
-        Update the tree sprite.
+        self.image = self.stump_surface
+        self.rect = self.image.get_rect(midbottom = self.rect.midbottom)
+        self.hitbox = self.rect.inflate(-10, -self.rect.height * 0.6)
+        for group in self.groups:
+            if hasattr(group, 'refresh'):  # The camera and collision grids have to know where the new rect is
+                group.refresh(self)
+        self.alive = False
+        
+    def restore(self, health, alive, slots):
+        """
+        Put back the state of a saved tree. It must be called on a tree that was never cut.
 
         Args:
-            dt (int): The time in milliseconds since the last frame.
+            health (int): The health of the tree.
+            alive (bool): Whether the tree is still standing.
+            slots (int | None): The positions with an apple (one bit per position), or None to keep the apples it has.
         """
-        if self.alive:
-            self.death()
-
+        if slots is not None:
+            for apple in self.apple_sprites.sprites():
+                apple.kill()
+            self.create_fruit(slots)  # The apples are placed on the tree, even the ones left on a stump
+        
+        self.health = health
+        if not alive and self.alive:
+            self.become_stump()
+        
 class Interaction(Tile):
     """
     A class for interaction tiles. Interaction tiles are tiles that can be interacted with by the player.
@@ -0,0 +1,19 @@
+import os
+
+
+def write_atomically(path, *chunks):
+    """
+    Write a file through a temporary file, flushed to the disk and then renamed over the old one, so a crash
+    (or the game closing in the middle of a write) never leaves a broken or empty file behind.
+
+    Args:
+        path (string): The path of the file.
+        *chunks (bytes): The contents of the file, in order.
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        for chunk in chunks:
+            file.write(chunk)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
@@ -0,0 +1,95 @@
+from settings import *
+
+
+class RegionStreamer:
+    """
+    Keeps loaded only the regions of the map (squares of CHUNK_SIZE tiles, the same as the camera chunks)
+    around a point, usually the player. The regions are loaded nearest first, a few per step, and the ones
+    left behind are evicted once they are a region further than the radius (so walking along an edge does
+    not load and evict the same regions over and over).
+    """
+    def __init__(self, columns, rows, load, unload, radius=STREAM_RADIUS):
+        """
+        Args:
+            columns (int): The width of the map in regions.
+            rows (int): The height of the map in regions.
+            load (Callable): Function that loads a region, given its (x, y).
+            unload (Callable): Function that evicts a region, given its (x, y).
+            radius (int): The distance (in regions) up to where the regions are loaded.
+        """
+        self.columns = columns
+        self.rows = rows
+        self.load = load
+        self.unload = unload
+        self.radius = radius
+        self.region_pixels = CHUNK_SIZE * TILE_SIZE
+
+        self.loaded = set()
+        self.queue = []  # Regions waiting to be loaded, nearest first
+        self.center = None  # Region of the point on the last update
+
+    def region(self, pos):
+        """
+        Get the region that contains a point.
+
+        Args:
+            pos (Tuple[float, float]): The point in the world.
+
+        Returns:
+            Tuple[int, int]: The x and y of the region.
+        """
+        return int(pos[0] // self.region_pixels), int(pos[1] // self.region_pixels)
+
+    def around(self, center, radius):
+        """
+        Get the regions of the map around a region, nearest first.
+
+        Args:
+            center (Tuple[int, int]): The region in the middle.
+            radius (int): The distance in regions (on each axis).
+
+        Returns:
+            List[Tuple[int, int]]: The regions.
+        """
+        cx, cy = center
+        regions = [(x, y)
+                   for y in range(max(cy - radius, 0), min(cy + radius + 1, self.rows))
+                   for x in range(max(cx - radius, 0), min(cx + radius + 1, self.columns))]
+        regions.sort(key=lambda region: max(abs(region[0] - cx), abs(region[1] - cy)))
+        return regions
+
+    def update(self, pos, limit=STREAM_LOADS_PER_STEP):
+        """
+        Evict the regions that were left behind and load the ones that came within the radius of a point.
+
+        Args:
+            pos (Tuple[float, float]): The point, in the world.
+            limit (int | None): The most regions loaded in this call (None loads all of them).
+        """
+        center = self.region(pos)
+        if center != self.center:
+            self.center = center
+            cx, cy = center
+            for region in [region for region in self.loaded
+                           if max(abs(region[0] - cx), abs(region[1] - cy)) > self.radius + 1]:
+                self.loaded.discard(region)
+                self.unload(region)
+            self.queue = [region for region in self.around(center, self.radius) if region not in self.loaded]
+
+        loads = 0
+        while self.queue and (limit is None or loads < limit):
+            region = self.queue.pop(0)
+            if region not in self.loaded:
+                self.loaded.add(region)
+                self.load(region)
+                loads += 1
+
+    def clear(self):
+        """
+        Evict every region.
+        """
+        for region in list(self.loaded):
+            self.unload(region)
+        self.loaded.clear()
+        self.queue = []
+        self.center = None
@@ -0,0 +1,405 @@
+import pygame
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+from pytmx.util_pygame import load_pygame
+
+from storage import write_atomically
+
+
+MAP_CACHE_MAGIC = b"SLMAP"
+MAP_CACHE_VERSION = 3
+MAP_CACHE_HEADER = struct.Struct("<5sHI")  # Magic, version and size of the json header
+
+
+class MapObject:
+    """
+    An object of an object layer (position, size, name and image, if it has one).
+    """
+    def __init__(self, x, y, width, height, name, type, image):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.name = name
+        self.type = type
+        self.image = image
+
+class TileLayer:
+    """
+    A layer of tiles. The tiles are stored as an array of ids (0 means an empty cell) into the map tile table.
+    """
+    def __init__(self, name, visible, width, height, gids, images):
+        self.name = name
+        self.visible = visible
+        self.width = width
+        self.height = height
+        self.gids = gids
+        self.images = images
+
+    def tiles(self):
+        """
+        Iterate over the tiles of the layer that are not empty.
+
+        Yields:
+            Tuple[int, int, pygame.Surface]: The x and y of the tile (in tiles) and its image.
+        """
+        for index, gid in enumerate(self.gids):
+            if gid:
+                yield index % self.width, index // self.width, self.images[gid]
+
+    def tiles_in(self, left, top, right, bottom):
+        """
+        Iterate over the tiles of an area of the layer that are not empty. Only the rows of the area are read.
+
+        Args:
+            left (int): The first column of the area.
+            top (int): The first row of the area.
+            right (int): The column after the last one of the area.
+            bottom (int): The row after the last one of the area.
+
+        Yields:
+            Tuple[int, int, pygame.Surface]: The x and y of the tile (in tiles) and its image.
+        """
+        left, right = max(left, 0), min(right, self.width)
+        for y in range(max(top, 0), min(bottom, self.height)):
+            start = y * self.width
+            for x, gid in enumerate(self.gids[start + left:start + right], start=left):
+                if gid:
+                    yield x, y, self.images[gid]
+
+class ObjectLayer:
+    """
+    A layer of objects. Iterating over it gives its objects.
+    """
+    def __init__(self, name, visible, objects):
+        self.name = name
+        self.visible = visible
+        self.objects = objects
+
+    def __iter__(self):
+        return iter(self.objects)
+
+class TileMap:
+    """
+    A map made with Tiled, with its layers in the same order as in the tmx file.
+    """
+    def __init__(self, width, height, tilewidth, tileheight, layers, tilesets):
+        self.width = width
+        self.height = height
+        self.tilewidth = tilewidth
+        self.tileheight = tileheight
+        self.layers = layers
+        self.tilesets = tilesets  # Name, first gid and image of each tileset used by the map
+        self.source = None  # The memory mapped cache file, if the map was loaded from it
+        self.unconverted = None  # The tile images and their alpha flags, if they are not converted yet
+
+    def get_layer_by_name(self, name):
+        """
+        Get a layer by its name.
+
+        Args:
+            name (string): The name of the layer.
+
+        Returns:
+            TileLayer | ObjectLayer: The layer.
+        """
+        for layer in self.layers:
+            if layer.name == name:
+                return layer
+        raise ValueError(f"Layer not found: {name}")
+
+    def convert(self):
+        """
+        Convert the tile images to the display format. Maps read by a worker thread are converted here, on the
+        main thread, when they are first requested.
+        """
+        if self.unconverted is None:
+            return
+        images, alphas = self.unconverted
+        converted = {}  # {id of the image read from the cache: converted image}
+        for gid, image in enumerate(images):
+            if image is not None:
+                images[gid] = converted[id(image)] = image.convert_alpha() if alphas[gid] else image.convert()
+        for layer in self.layers:
+            if isinstance(layer, ObjectLayer):
+                for obj in layer:
+                    if obj.image is not None:
+                        obj.image = converted[id(obj.image)]
+        self.unconverted = None
+
+# Maps already loaded by this process
+loaded_maps = {}
+reading_maps = {}  # {path: Future}, maps being read by a worker thread
+
+
+def load_map(path):
+    """
+    Get a map. The tmx file is parsed only once per process, and a compiled binary copy of it is kept next to
+    the tmx file, so later runs can skip the xml parsing and image decoding entirely.
+
+    Args:
+        path (string): The path of the tmx file.
+
+    Returns:
+        TileMap: The map.
+    """
+    if path not in loaded_maps:
+        cache_path = os.path.splitext(path)[0] + ".cache"
+        reading = reading_maps.pop(path, None)
+        tile_map = reading.result() if reading is not None else read_map_cache(path, cache_path)
+        if tile_map is None:
+            tile_map = compile_map(path, cache_path)
+        tile_map.convert()
+        loaded_maps[path] = tile_map
+    return loaded_maps[path]
+
+
+def preload_map(path, executor):
+    """
+    Start reading the compiled copy of a map on a worker thread (checking the copy, reading the tile ids and
+    decoding the tile images). If there is no valid copy, the map is compiled on the main thread when it is
+    requested.
+
+    Args:
+        path (string): The path of the tmx file.
+        executor (concurrent.futures.Executor): The worker threads.
+    """
+    if path not in loaded_maps and path not in reading_maps:
+        cache_path = os.path.splitext(path)[0] + ".cache"
+        reading_maps[path] = executor.submit(read_map_cache, path, cache_path, False)
+
+
+def map_ready(path):
+    """
+    Check if a map can be requested without waiting for a worker thread.
+
+    Args:
+        path (string): The path of the tmx file.
+
+    Returns:
+        bool: True if the map is not being read by a worker thread anymore.
+    """
+    return path not in reading_maps or reading_maps[path].done()
+
+
+def map_sources(path):
+    """
+    Get the files a map is made of: the tmx file, the tsx files of its tilesets and every image they use (the
+    pixels of the tiles are kept in the compiled copy, so a change in an image has to be noticed too).
+
+    Args:
+        path (string): The path of the tmx file.
+
+    Returns:
+        List[string]: The paths of the files.
+    """
+    with open(path, encoding="utf-8") as file:
+        tmx = file.read()
+
+    folder = os.path.dirname(path)
+    tilesets = [os.path.normpath(os.path.join(folder, tileset)) for tileset in re.findall(r'<tileset[^>]*source="([^"]+)"', tmx)]
+    images = [os.path.normpath(os.path.join(folder, image)) for image in re.findall(r'<image[^>]*source="([^"]+)"', tmx)]
+    for tileset in tilesets:
+        with open(tileset, encoding="utf-8") as file:
+            tsx = file.read()
+        tileset_folder = os.path.dirname(tileset)
+        images.extend(os.path.normpath(os.path.join(tileset_folder, image)) for image in re.findall(r'<image[^>]*source="([^"]+)"', tsx))
+    return [path] + tilesets + images
+
+
+def map_signature(path):
+    """
+    Get the latest modification time of the map files and a hash of their contents.
+
+    Args:
+        path (string): The path of the tmx file.
+
+    Returns:
+        Tuple[int, string]: The modification time (in nanoseconds) and the sha1 hash.
+    """
+    return files_signature(map_sources(path))
+
+
+def files_signature(paths):
+    """
+    Get the latest modification time of some files and a hash of their contents.
+
+    Args:
+        paths (List[string]): The paths of the files.
+
+    Returns:
+        Tuple[int, string]: The modification time (in nanoseconds) and the sha1 hash.
+    """
+    mtime = 0
+    digest = hashlib.sha1()
+    for source in paths:
+        mtime = max(mtime, os.stat(source).st_mtime_ns)
+        with open(source, "rb") as file:
+            digest.update(file.read())
+    return mtime, digest.hexdigest()
+
+
+def compile_map(path, cache_path):
+    """
+    Parse the tmx file and write its compiled binary copy. The copy has a small json header (layers, objects,
+    tilesets and where each tile image is) followed by the tile id arrays of the layers and the RGBA pixels of
+    every tile image.
+
+    Args:
+        path (string): The path of the tmx file.
+        cache_path (string): The path where the compiled map is written.
+
+    Returns:
+        TileMap: The parsed map.
+    """
+    tmx_data = load_pygame(path)
+    images = list(tmx_data.images)
+
+    blob = bytearray()
+    header_tiles = [None]  # Tile id 0 is an empty cell
+    for image in images[1:]:
+        if image is None:
+            header_tiles.append(None)
+            continue
+        pixels = pygame.image.tostring(image, "RGBA")
+        has_alpha = bool(image.get_flags() & pygame.SRCALPHA)  # Tiles that look opaque are not converted with alpha
+        header_tiles.append([image.get_width(), image.get_height(), has_alpha, len(blob)])
+        blob += pixels
+
+    layers = []
+    header_layers = []
+    for layer in tmx_data.layers:
+        if hasattr(layer, "data"):  # Tile layer
+            gids = array("H", (gid for row in layer.data for gid in row))
+            header_layers.append({"kind": "tiles", "name": layer.name, "visible": bool(layer.visible), "offset": len(blob)})
+            blob += gids.tobytes()
+            layers.append(TileLayer(layer.name, bool(layer.visible), tmx_data.width, tmx_data.height, gids, images))
+        else:  # Object layer
+            objects = [MapObject(obj.x, obj.y, obj.width, obj.height, obj.name, obj.type, obj.image) for obj in layer]
+            header_objects = [[obj.x, obj.y, obj.width, obj.height, obj.name, obj.type, obj.gid] for obj in layer]
+            header_layers.append({"kind": "objects", "name": layer.name, "visible": bool(layer.visible), "objects": header_objects})
+            layers.append(ObjectLayer(layer.name, bool(layer.visible), objects))
+
+    tilesets = [(tileset.name, tileset.firstgid, tileset.source) for tileset in tmx_data.tilesets]
+    mtime, digest = map_signature(path)
+    header = {
+        "mtime": mtime,
+        "hash": digest,
+        "byteorder": sys.byteorder,
+        "size": [tmx_data.width, tmx_data.height, tmx_data.tilewidth, tmx_data.tileheight],
+        "tilesets": tilesets,
+        "tiles": header_tiles,
+        "layers": header_layers,
+    }
+
+    # Written to a temporary file first, so a crash never leaves a broken cache behind
+    header_bytes = json.dumps(header).encode("utf-8")
+    write_atomically(cache_path, MAP_CACHE_HEADER.pack(MAP_CACHE_MAGIC, MAP_CACHE_VERSION, len(header_bytes)), header_bytes, blob)
+
+    return TileMap(tmx_data.width, tmx_data.height, tmx_data.tilewidth, tmx_data.tileheight, layers, tilesets)
+
+
+def read_map_cache(path, cache_path, convert=True):
+    """
+    Load the compiled copy of a map through memory mapping. The copy is only used if it was made from the
+    current version of the map files (same modification time, or the same contents).
+
+    Args:
+        path (string): The path of the tmx file.
+        cache_path (string): The path of the compiled map.
+        convert (bool): Convert the tile images to the display format (only the main thread should do it).
+
+    Returns:
+        TileMap | None: The map, or None if there is no valid compiled copy.
+    """
+    if not os.path.exists(cache_path) or os.path.getsize(cache_path) < MAP_CACHE_HEADER.size:
+        return None
+
+    with open(cache_path, "rb") as file:
+        source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # A damaged copy (like one cut short by a crash) is compiled again, as if there was none
+    try:
+        tile_map = parse_map_cache(path, source, convert)
+    except (ValueError, KeyError, IndexError, TypeError, struct.error, pygame.error):  # Includes json errors
+        tile_map = None
+    if tile_map is None:
+        source.close()
+    return tile_map
+
+
+def parse_map_cache(path, source, convert):
+    """
+    Read the map out of its compiled copy.
+
+    Args:
+        path (string): The path of the tmx file.
+        source (mmap.mmap): The compiled copy, memory mapped.
+        convert (bool): Convert the tile images to the display format (only the main thread should do it).
+
+    Returns:
+        TileMap | None: The map, or None if the copy is from another version of the map files or of the game.
+
+    Raises:
+        ValueError: If the copy is damaged (other errors of a bad header, like KeyError, are raised as they are).
+    """
+    magic, version, header_size = MAP_CACHE_HEADER.unpack_from(source)
+    if magic != MAP_CACHE_MAGIC or version != MAP_CACHE_VERSION:
+        return None
+
+    start = MAP_CACHE_HEADER.size
+    header = json.loads(source[start:start + header_size])
+    blob_start = start + header_size
+
+    def blob(offset, size):
+        # A slice past the end of the file is only cut short, it does not fail on its own
+        if offset < 0 or blob_start + offset + size > len(source):
+            raise ValueError("The compiled map is cut short")
+        return blob_start + offset
+
+    valid = header["byteorder"] == sys.byteorder
+    if valid and header["mtime"] != max(os.stat(source_path).st_mtime_ns for source_path in map_sources(path)):
+        valid = header["hash"] == map_signature(path)[1]
+    if not valid:
+        return None
+
+    images = [None]
+    alphas = [False]
+    for tile in header["tiles"][1:]:
+        if tile is None:
+            images.append(None)
+            alphas.append(False)
+            continue
+        width, height, has_alpha, offset = tile
+        offset = blob(offset, width * height * 4)
+        pixels = source[offset:offset + width * height * 4]
+        images.append(pygame.image.fromstring(pixels, (width, height), "RGBA"))
+        alphas.append(has_alpha)
+
+    width, height, tilewidth, tileheight = header["size"]
+    view = memoryview(source)
+    layers = []
+    for layer in header["layers"]:
+        if layer["kind"] == "tiles":
+            offset = blob(layer["offset"], width * height * 2)
+            gids = view[offset:offset + width * height * 2].cast("H")
+            layers.append(TileLayer(layer["name"], layer["visible"], width, height, gids, images))
+        else:
+            objects = [MapObject(x, y, obj_width, obj_height, name, type, images[gid] if gid else None)
+                       for x, y, obj_width, obj_height, name, type, gid in layer["objects"]]
+            layers.append(ObjectLayer(layer["name"], layer["visible"], objects))
+
+    tile_map = TileMap(width, height, tilewidth, tileheight, layers, [tuple(tileset) for tileset in header["tilesets"]])
+    tile_map.source = source  # The tile layers read their ids straight from the mapped file
+    tile_map.unconverted = (images, alphas)
+    if convert:
+        tile_map.convert()
+    return tile_map
@@ -1,38 +1,148 @@
 import pygame
 
+import heapq
+from itertools import count
+
+class GameClock:
+    """
+    Time source of the game. It uses the real time (pygame ticks), unless a simulated time is set, like in
+    headless runs, where the time only moves when the game says so.
+    """
+    def __init__(self):
+        self.simulated_ticks = None
+        
+    def get_ticks(self):
+        """
+        Get the current time.
+
+        Returns:
+            int: The time in milliseconds.
+        """
+        if self.simulated_ticks is None:
+            return pygame.time.get_ticks()
+        return int(self.simulated_ticks)
+    
+    def simulate(self, ticks=0):
+        """
+        Stop following the real time and use a simulated time instead.
+
+        Args:
+            ticks (int): The starting simulated time in milliseconds.
+        """
+        self.simulated_ticks = ticks
+        
+    def advance(self, milliseconds):
+        """
+        Move the simulated time forward.
+
+        Args:
+            milliseconds (float): The time to be added.
+        """
+        self.simulated_ticks += milliseconds
+        
+    def reset(self):
+        """
+        Start the simulated time again from zero, if it is simulated (the real time can not be reset).
+        """
+        if self.simulated_ticks is not None:
+            self.simulated_ticks = 0
+
+class Scheduler:
+    """
+    Central scheduler of the timed events of the game. The events are kept in a min-heap ordered by the time
+    they are due, and the scheduler is advanced once per frame, so only the events that are due are looked at.
+    """
+    def __init__(self, clock):
+        self.clock = clock
+        self.events = []  # Heap of [due time, order, callback], the callback is None if the event was cancelled
+        self.order = count()  # Events due at the same time fire in the order they were scheduled
+        
+    def schedule(self, delay, callback):
+        """
+        Schedule a function to be called after a delay.
+
+        Args:
+            delay (int): The delay in milliseconds.
+            callback (Callable): The function to be called (without arguments).
+
+        Returns:
+            List: The event, that can be given to cancel().
+        """
+        event = [self.clock.get_ticks() + delay, next(self.order), callback]
+        heapq.heappush(self.events, event)
+        return event
+        
+    def cancel(self, event):
+        """
+        Cancel a scheduled event. It is only dropped from the heap when its time comes.
+
+        Args:
+            event (List): The event returned by schedule().
+        """
+        event[2] = None
+        
+    def clear(self):
+        """
+        Drop every scheduled event, like the timers of a scene that was released.
+        """
+        self.events.clear()
+        
+    def update(self):
+        """
+        Fire every event that is due, in order.
+        """
+        time = self.clock.get_ticks()
+        while self.events and self.events[0][0] <= time:
+            callback = heapq.heappop(self.events)[2]
+            if callback is not None:
+                callback()
+
+# Shared by everything that needs the current time, or needs something to happen later
+game_clock = GameClock()
+scheduler = Scheduler(game_clock)
+
 class Timer:
     """
     Timer class to be used in the game. It can be used to delay an action or to measure the time between two events.
+    It is a handle on an event of the scheduler, so it does not have to be updated.
     """
     def __init__(self, duration, function=None):
         self.duration = duration
-        self.time_0 = 0
         self.active = False
+        self.event = None
         
         # If a function is given, it will be executed when the timer is done
         self.function = function
         
     def activate(self):
         """
-        Activate the timer.
+        Activate the timer (it starts again if it was already active).
         """
+        if self.event is not None:
+            scheduler.cancel(self.event)
         self.active = True
-        self.time_0 = pygame.time.get_ticks()  # Get the current time in milliseconds
+        self.event = scheduler.schedule(self.duration, self.expire)
         
     def deactivate(self):
         """
         Deactivate the timer.
         """
+        if self.event is not None:
+            scheduler.cancel(self.event)
+            self.event = None
+        self.active = False
+        
+    def expire(self):
+        """
+        Called by the scheduler when the timer is done.
+        """
+        self.event = None
         self.active = False
-        self.time_0 = 0
+        if self.function is not None:  # If a function is given, execute it
+            self.function()
         
     def update(self):
         """
-        Update the timer.
+        Kept for compatibility, the scheduler fires the timer when it is done.
         """
-        time = pygame.time.get_ticks()  # Get the current time in milliseconds
-        if time - self.time_0 >= self.duration:
-            if self.function is not None and self.time_0 != 0:  # If a function is given, execute it
-                self.function()
-                
-            self.deactivate()
\ No newline at end of file
+        pass
\ No newline at end of file
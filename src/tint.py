@@ -0,0 +1,66 @@
+import pygame
+from settings import *
+
+from collections import OrderedDict
+
+
+class ScreenTint:
+    """
+    Post-process stage that darkens the whole screen. The day/night color and the fade of the sleep transition
+    are merged into a single multiply pass, which is skipped when the result is white. The tint surfaces are
+    cached by (quantized) color, so a steady tint does not fill a full screen surface every frame.
+    """
+    def __init__(self):
+        self.display_surface = pygame.display.get_surface()
+        self.surfaces = OrderedDict()  # {color: surface}, the least recently used color is dropped first
+
+    def color(self, day_color, fade):
+        """
+        Merge the day color and the fade into one color, rounded to TINT_QUANTUM steps (white stays white, so
+        the pass is still skipped in daylight).
+
+        Args:
+            day_color (List[float]): The color of the day/night cycle.
+            fade (int): The brightness of the sleep transition (255 means no fade).
+
+        Returns:
+            Tuple[int, int, int]: The color to be multiplied with the screen.
+        """
+        return tuple(min(255, (int(channel * fade / 255) + TINT_QUANTUM // 2) // TINT_QUANTUM * TINT_QUANTUM)
+                     for channel in day_color)
+
+    def surface(self, color):
+        """
+        Get the tint surface of a color, filling a new one only if the color is not cached.
+
+        Args:
+            color (Tuple[int, int, int]): The tint color.
+
+        Returns:
+            pygame.Surface: A screen-sized surface filled with the color.
+        """
+        if color in self.surfaces:
+            self.surfaces.move_to_end(color)
+            return self.surfaces[color]
+
+        if len(self.surfaces) >= TINT_CACHE_SIZE:
+            # The oldest surface is filled again instead of allocating a new one
+            surface = self.surfaces.popitem(last=False)[1]
+        else:
+            surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        surface.fill(color)
+        self.surfaces[color] = surface
+        return surface
+
+    def apply(self, day_color, fade=255):
+        """
+        Multiply the screen by the merged tint.
+
+        Args:
+            day_color (List[float]): The color of the day/night cycle.
+            fade (int): The brightness of the sleep transition (255 means no fade).
+        """
+        color = self.color(day_color, fade)
+        if color == (255, 255, 255):
+            return
+        self.display_surface.blit(self.surface(color), (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
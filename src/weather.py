@@ -1,17 +1,17 @@
 import pygame
 from settings import *
-from sprites import Tile
+import assets
 
-from random import randint, choice
+from random import getrandbits
+
+import numpy as np
 
 
 class Day:
     """
-    Class for the day/night cycle.
+    Class for the day/night cycle. It only keeps the color of the day, the screen is tinted by the level.
     """
     def __init__(self):
-        self.display = pygame.display.get_surface()
-        self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         self.day_color = [255, 255, 255]
         self.night_color = [40, 80, 115]
         
@@ -22,43 +22,11 @@ class Day:
         for i, color in enumerate(self.night_color):
             if self.day_color[i] > color:
                 self.day_color[i] -= 2 * dt
-                
-        self.screen.fill(self.day_color)
-        self.display.blit(self.screen, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
-
-class Drop(Tile):
-    """
-    Class for rain drops. It can be used for rain particles or for puddles.
-    """
-    def __init__(self, surf, pos, moving, groups, z):
-        super().__init__(pos, surf, groups, z)
-        
-        self.duration = randint(400, 500)
-        self.time0 = pygame.time.get_ticks()
-        
-        self.moving = moving
-        if self.moving:
-            self.direction = pygame.math.Vector2(-2, 4)
-            self.pos = pygame.math.Vector2(self.rect.topleft)
-            self.speed = randint(50, 100)
-            
-    def update(self, dt):
-        """
-        Update the rain drop depending on its type.
-
-        Args:
-            dt (int): The time in milliseconds since the last frame.
-        """
-        if self.moving:  # If it is a drop
-            self.pos += self.direction * self.speed * dt
-            self.rect.topleft = ((round(self.pos.x)), (round(self.pos.y)))
-            
-        if pygame.time.get_ticks() - self.time0 >= self.duration:
-            self.kill()
 
 class Rain:
     """
-    Class for rain particles and effects.
+    Class for rain particles and effects. The drops live in a fixed-size pool of NumPy arrays instead of being
+    sprites: they are spawned at a fixed rate inside the camera view and drawn in one batch per layer.
     """
     def __init__(self, all_sprites):
         self.all_sprites = all_sprites
@@ -67,7 +35,20 @@ class Rain:
         self.rain_floor = []
         self.import_assets()
         
-        self.floor_w , self.floor_h = MAP_WIDTH * TILE_SIZE, MAP_HEIGHT * TILE_SIZE
+        # Particle pool ---------------------------------------------------------------------------------
+        self.capacity = RAIN_CAPACITY
+        self.pos = np.zeros((self.capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((self.capacity, 2), dtype=np.float32)
+        self.lifetime = np.zeros(self.capacity, dtype=np.float32)  # Seconds left, 0 means a free slot
+        self.frame = np.zeros(self.capacity, dtype=np.int8)  # Index of the image of the particle
+        self.moving = np.zeros(self.capacity, dtype=bool)  # Falling drop or puddle on the floor
+        
+        # Seeded from the random module, so headless runs with a seed always rain the same way
+        self.rng = np.random.default_rng(getrandbits(32))
+        self.spawn_time = {False: 0.0, True: 0.0}  # Time not spent yet on spawning puddles and drops
+        
+        self.all_sprites.add_layer_hook(LAYERS['rain_floor'], self.draw_puddles)
+        self.all_sprites.add_layer_hook(LAYERS['rain_drops'], self.draw_drops)
     
     def import_assets(self):
         """
@@ -76,35 +57,73 @@ class Rain:
         
         # Each kind of rain drop has 3 different frames
         for i in range(1, 4):
-            rain_frame = pygame.image.load(f"assets/Rain/rain{i}.png").convert_alpha()
-            self.rain_drops.append(rain_frame)
-
-            floor_rain_frame = pygame.image.load(f"assets/Rain/floor{i}.png").convert_alpha()
-            self.rain_floor.append(floor_rain_frame)
+            self.rain_drops.append(assets.frame(f"rain{i}"))
+            self.rain_floor.append(assets.frame(f"floor{i}"))
             
-    def create_puddle(self):
+    def spawn(self, count, moving, area):
         """
-        Create a rain drop on the floor (puddle).
+        Spawn particles in free slots of the pool. They are not spawned if the pool is full.
+
+        Args:
+            count (int): The number of particles.
+            moving (bool): Falling drops (True) or puddles (False).
+            area (pygame.Rect): The area of the world where they are spawned.
         """
-        Drop(surf=choice(self.rain_floor), 
-             pos=(randint(0, self.floor_w), randint(0, self.floor_h)), 
-             moving=False, 
-             groups=self.all_sprites, 
-             z=LAYERS['rain_floor'])
+        slots = np.flatnonzero(self.lifetime <= 0)[:count]
+        count = len(slots)
+        if not count:
+            return
+        
+        self.pos[slots, 0] = self.rng.integers(area.left, area.right + 1, count)
+        self.pos[slots, 1] = self.rng.integers(area.top, area.bottom + 1, count)
+        self.lifetime[slots] = self.rng.integers(RAIN_LIFETIME[0], RAIN_LIFETIME[1] + 1, count) / 1000
+        self.frame[slots] = self.rng.integers(0, 3, count)
+        self.moving[slots] = moving
+        if moving:
+            self.velocity[slots] = np.array(RAIN_DIRECTION, dtype=np.float32) * self.rng.integers(50, 101, count)[:, np.newaxis]
+        else:
+            self.velocity[slots] = 0
     
-    def create_drop(self):
+    def update(self, dt, raining=True):
         """
-        Create a falling rain drop.
+        Update the rain: move and age the particles, and spawn new ones inside the camera view.
+
+        Args:
+            dt (int): The time since the last frame.
+            raining (bool): False stops the spawning (the particles left still fade out).
         """
-        Drop(surf=choice(self.rain_drops), 
-             pos=(randint(0, self.floor_w), randint(0, self.floor_h)), 
-             moving=True, 
-             groups=self.all_sprites, 
-             z=LAYERS['rain_drops'])
+        self.pos += self.velocity * dt
+        np.subtract(self.lifetime, dt, out=self.lifetime)
+        
+        if raining:
+            # The falling drops also spawn a bit above and to the right of the view, since they move down and left
+            view = self.all_sprites.view_rect()
+            for moving, rate in ((False, RAIN_PUDDLES_PER_SECOND), (True, RAIN_DROPS_PER_SECOND)):
+                self.spawn_time[moving] += dt * rate
+                count = int(self.spawn_time[moving])
+                self.spawn_time[moving] -= count
+                area = pygame.Rect(view.x, view.y - RAIN_MARGIN, view.width + RAIN_MARGIN, view.height + RAIN_MARGIN) if moving else view
+                self.spawn(count, moving, area)
     
-    def update(self):
+    def draw(self, surface, offset, moving, frames):
         """
-        Update the rain.
+        Draw the live particles of one kind with a single blits call.
+
+        Args:
+            surface (pygame.Surface): The surface where the world is drawn.
+            offset (pygame.math.Vector2): The camera offset.
+            moving (bool): Draw the falling drops (True) or the puddles (False).
+            frames (List[pygame.Surface]): The images of that kind of particle.
         """
-        self.create_puddle() 
-        self.create_drop()
\ No newline at end of file
+        live = np.flatnonzero((self.lifetime > 0) & (self.moving == moving))
+        if not len(live):
+            return
+        
+        positions = (np.rint(self.pos[live]) - (int(offset.x), int(offset.y))).astype(int).tolist()
+        surface.blits(list(zip([frames[index] for index in self.frame[live].tolist()], positions)), False)
+    
+    def draw_puddles(self, surface, offset):
+        self.draw(surface, offset, False, self.rain_floor)
+        
+    def draw_drops(self, surface, offset):
+        self.draw(surface, offset, True, self.rain_drops)